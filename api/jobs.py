@@ -200,9 +200,9 @@ jurisdiction: str = "INTERNATIONAL"
 """
 Analyze multiple clauses in bulk.
 """
-from src.graph import compile_graph
+from src.graph import get_default_graph
 results = []
-app = compile_graph()
+app = get_default_graph()
 for i, clause in enumerate(clauses):
 try:
 state = {
@@ -20,7 +20,7 @@ ContractCreateRequest, ContractUpdateRequest, ContractResponse, ContractListResp
 HealthResponse, ErrorResponse,
 Jurisdiction, AnalysisDepth, InferenceMode
 )
-from src.graph import compile_graph
+from src.graph import get_default_graph
 from src.explainability import ExplainabilityEngine, build_explainable_verdict
 from src.logger import setup_logger
 logger = setup_logger("bale_api")
@@ -30,7 +30,7 @@ async def lifespan(app: FastAPI):
 """Initialize resources on startup, cleanup on shutdown."""
 logger.info(" BALE API Starting...")
 # Pre-compile the graph for faster first request
-app.state.graph = compile_graph()
+app.state.graph = get_default_graph()
 app.state.explainability = ExplainabilityEngine()
 # Check inference availability
 app.state.local_available = bool(os.getenv("LOCAL_LLM_ENDPOINT"))
@@ -80,8 +80,37 @@ app.include_router(v8_router, prefix="/api")
 logger.info("V8 Analysis routes: ")
 except Exception as e:
 logger.warning(f"V8 routes not loaded: {e}")
+# Start background job queue
+try:
+from api.jobs import job_queue
+await job_queue.start()
+except Exception as e:
+logger.warning(f"Job queue not started: {e}")
+# Start webhook delivery workers
+try:
+from api.webhooks import dispatcher, slack_notifier
+await dispatcher.start()
+await slack_notifier.start()
+except Exception as e:
+logger.warning(f"Webhook workers not started: {e}")
 yield
 logger.info(" BALE API Shutting down...")
+try:
+from api.webhooks import dispatcher, slack_notifier
+await dispatcher.close()
+await slack_notifier.close()
+except Exception as e:
+logger.warning(f"Webhook shutdown failed: {e}")
+try:
+from api.jobs import job_queue
+await job_queue.stop()
+except Exception as e:
+logger.warning(f"Job queue stop failed: {e}")
+try:
+from api.routes import close_llm_client
+await close_llm_client()
+except Exception as e:
+logger.warning(f"LLM client close failed: {e}")
 # ==================== APP SETUP ====================
 app = FastAPI(
 title="BALE API",
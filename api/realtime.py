@@ -11,6 +11,7 @@ from enum import Enum
 from fastapi import WebSocket, WebSocketDisconnect
 from starlette.responses import StreamingResponse
 from src.logger import setup_logger
+from src import jsonio
 logger = setup_logger("bale_realtime")
 # ==================== MESSAGE TYPES ====================
 class MessageType(str, Enum):
@@ -53,12 +54,20 @@ def __init__(self):
 self.connections: Dict[str, Set[WebSocket]] = {}
 # Analysis subscriptions: analysis_id -> set of websockets
 self.subscriptions: Dict[str, Set[WebSocket]] = {}
+# Running total of open connections (event-loop only, no lock needed)
+self._active_count = 0
+@property
+def active_count(self) -> int:
+"""Number of open WebSocket connections across all users."""
+return self._active_count
 async def connect(self, websocket: WebSocket, user_id: str):
 """Accept and register a new WebSocket connection."""
 await websocket.accept()
 if user_id not in self.connections:
 self.connections[user_id] = set()
+if websocket not in self.connections[user_id]:
 self.connections[user_id].add(websocket)
+self._active_count += 1
 logger.info(f"WebSocket connected: user={user_id}")
 # Send connected message
 await self.send_personal(websocket, RealtimeMessage(
@@ -68,7 +77,9 @@ data={"user_id": user_id}
 def disconnect(self, websocket: WebSocket, user_id: str):
 """Unregister a WebSocket connection."""
 if user_id in self.connections:
-self.connections[user_id].discard(websocket)
+if websocket in self.connections[user_id]:
+self.connections[user_id].remove(websocket)
+self._active_count -= 1
 if not self.connections[user_id]:
 del self.connections[user_id]
 # Remove from all subscriptions
@@ -98,7 +109,9 @@ for websocket in list(self.connections[user_id]):
 try:
 await websocket.send_text(message.to_json())
 except Exception:
-self.connections[user_id].discard(websocket)
+if websocket in self.connections[user_id]:
+self.connections[user_id].remove(websocket)
+self._active_count -= 1
 async def broadcast_to_analysis(
 self, analysis_id: str, message: RealtimeMessage
 ):
@@ -210,6 +223,8 @@ data={
 )
 )
 # ==================== SERVER-SENT EVENTS ====================
+_SSE_TIMEOUT = b"event: timeout\ndata: {}\n\n"
+_SSE_PING = b"event: ping\ndata: {}\n\n"
 async def sse_generator(
 analysis_id: str,
 timeout: int = 300
@@ -237,19 +252,22 @@ start_time = asyncio.get_event_loop().time()
 while True:
 # Check timeout
 if asyncio.get_event_loop().time() - start_time > timeout:
-yield f"event: timeout\ndata: {{}}\n\n"
+yield _SSE_TIMEOUT
 break
 try:
 # Wait for message with timeout
 message = await asyncio.wait_for(queue.get(), timeout=30)
-yield f"event: {message.type.value}\n"
-yield f"data: {json.dumps(message.data)}\n\n"
+# One pre-encoded chunk per event
+yield (
+b"event: " + message.type.value.encode() +
+b"\ndata: " + jsonio.dumps(message.data) + b"\n\n"
+)
 # Stop on completion or error
 if message.type in [MessageType.ANALYSIS_COMPLETED, MessageType.ANALYSIS_ERROR]:
 break
 except asyncio.TimeoutError:
 # Send keepalive
-yield f"event: ping\ndata: {{}}\n\n"
+yield _SSE_PING
 except asyncio.CancelledError:
 pass
 # ==================== WEBSOCKET HANDLER ====================
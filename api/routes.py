@@ -9,12 +9,13 @@ from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query, BackgroundTasks
 from fastapi.responses import StreamingResponse, HTMLResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, constr, field_validator
 from api.analytics import analytics_engine, report_generator, dashboard_provider, TimeRange
 from api.realtime import websocket_handler, sse_generator, AnalysisProgressTracker, manager
 from api.jobs import job_queue, run_background, JobStatus
 from api.webhooks import emit_event_async, EventType
 from api.cache import cache, analysis_cache_key
+from api.schemas import MAX_BULK_CHARS, MAX_BULK_CLAUSES, MAX_CLAUSE_CHARS
 from src.logger import setup_logger
 logger = setup_logger("bale_api_routes")
 # ==================== ROUTERS ====================
@@ -23,7 +24,24 @@ realtime_router = APIRouter(tags=["Real-time"])
 jobs_router = APIRouter(prefix="/v1/jobs", tags=["Jobs"])
 reports_router = APIRouter(prefix="/v1/reports", tags=["Reports"])
 metrics_router = APIRouter(tags=["Metrics"])
+# Shared client for the deep health LLM probe (keep-alive across probes)
+_llm_client = None
+def _get_llm_client():
+global _llm_client
+if _llm_client is None or _llm_client.is_closed:
+import httpx
+_llm_client = httpx.AsyncClient(
+timeout=httpx.Timeout(5.0, connect=1.0),
+limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+)
+return _llm_client
+async def close_llm_client():
+"""Close the shared LLM probe client."""
+if _llm_client is not None and not _llm_client.is_closed:
+await _llm_client.aclose()
 # ==================== ANALYTICS ENDPOINTS ====================
+# Query-string -> TimeRange lookup (invalid values fall back to 7d)
+_TR_MAP = {m.value: m for m in TimeRange}
 class DashboardDataResponse(BaseModel):
 summary: dict
 risk_trend: List[dict]
@@ -38,10 +56,7 @@ async def get_analytics_summary(
 time_range: str = Query("7d", description="Time range: 24h, 7d, 30d, 90d, all")
 ):
 """Get analytics summary for a time period."""
-try:
-tr = TimeRange(time_range)
-except ValueError:
-tr = TimeRange.LAST_7D
+tr = _TR_MAP.get(time_range, TimeRange.LAST_7D)
 summary = analytics_engine.get_summary(tr)
 return summary.to_dict()
 @analytics_router.get("/risk-trend")
@@ -86,20 +101,24 @@ result: Optional[dict]
 error: Optional[str]
 class BulkAnalysisRequest(BaseModel):
 contract_id: str
-clauses: List[str]
+clauses: List[constr(min_length=1, max_length=MAX_CLAUSE_CHARS)] = Field(
+..., max_length=MAX_BULK_CLAUSES
+)
 jurisdiction: str = "INTERNATIONAL"
+@field_validator("clauses")
+@classmethod
+def check_total_size(cls, v: List[str]) -> List[str]:
+total = sum(len(c) for c in v)
+if total > MAX_BULK_CHARS:
+raise ValueError(f"Total clause text too large ({total} > {MAX_BULK_CHARS} chars)")
+return v
 @jobs_router.post("/bulk-analysis", response_model=JobResponse)
-async def start_bulk_analysis(
-request: BulkAnalysisRequest,
-background_tasks: BackgroundTasks
-):
+async def start_bulk_analysis(request: BulkAnalysisRequest):
 """
 Start a bulk analysis job for multiple clauses.
 Returns immediately with job ID for polling.
+The job queue worker is started once in the API lifespan.
 """
-# Start job queue if not running
-if not job_queue._running:
-background_tasks.add_task(job_queue.start)
 job = await run_background(
 "bulk_analysis",
 request.contract_id,
@@ -146,10 +165,7 @@ time_range: str = "7d"
 @reports_router.post("/generate")
 async def generate_report(request: ReportRequest, background_tasks: BackgroundTasks):
 """Generate an analytics report."""
-try:
-tr = TimeRange(request.time_range)
-except ValueError:
-tr = TimeRange.LAST_7D
+tr = _TR_MAP.get(request.time_range, TimeRange.LAST_7D)
 summary = analytics_engine.get_summary(tr)
 if request.format == "html":
 html = report_generator.generate_html_report(summary)
@@ -191,8 +207,7 @@ metrics.append("bale_cache_connected 1")
 else:
 metrics.append("bale_cache_connected 0")
 # Active WebSocket connections
-total_ws = sum(len(conns) for conns in manager.connections.values())
-metrics.append(f"bale_websocket_connections {total_ws}")
+metrics.append(f"bale_websocket_connections {manager.active_count}")
 return "\n".join(metrics) + "\n"
 @metrics_router.get("/health/deep")
 async def deep_health_check():
@@ -227,8 +242,7 @@ checks["database"] = {"status": "error", "error": str(e)}
 local_endpoint = os.getenv("LOCAL_LLM_ENDPOINT")
 if local_endpoint:
 try:
-import httpx
-async with httpx.AsyncClient(timeout=5.0) as client:
+client = _get_llm_client()
 resp = await client.get(local_endpoint.replace("/chat/completions", "/health"))
 if resp.status_code < 400:
 checks["llm_local"] = {"status": "healthy"}
@@ -5,18 +5,17 @@ Complete V8 analysis endpoints with explainability.
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
-from enum import Enum
+from api.schemas import MAX_BULK_CLAUSES, MAX_CLAUSE_CHARS
 from src.logger import setup_logger
+from src.risk_model_v8 import PartyPosition as PP
 logger = setup_logger("bale_v8_api")
 router = APIRouter(prefix="/v8", tags=["V8 Analysis"])
 # ==================== REQUEST/RESPONSE MODELS ====================
-class PartyPosition(str, Enum):
-BUYER = "BUYER"
-SELLER = "SELLER"
-NEUTRAL = "NEUTRAL"
+# Re-export the analyzer enum so requests need no mapping step
+PartyPosition = PP
 class ClauseAnalysisRequest(BaseModel):
 """Request for single clause analysis."""
-clause_text: str = Field(..., min_length=10, description="The clause text to analyze")
+clause_text: str = Field(..., min_length=10, max_length=MAX_CLAUSE_CHARS, description="The clause text to analyze")
 party_position: PartyPosition = Field(default=PartyPosition.NEUTRAL)
 contract_value: float = Field(default=1000000, ge=0)
 run_specialists: bool = Field(default=True, description="Run specialist agents")
@@ -31,7 +30,7 @@ json_schema_extra = {
 }
 class ContractAnalysisRequest(BaseModel):
 """Request for full contract analysis."""
-clauses: List[str] = Field(..., min_items=1, description="List of clause texts")
+clauses: List[str] = Field(..., min_length=1, max_length=MAX_BULK_CLAUSES, description="List of clause texts")
 party_position: PartyPosition = Field(default=PartyPosition.NEUTRAL)
 contract_value: float = Field(default=1000000, ge=0)
 class ClauseClassificationResult(BaseModel):
@@ -134,15 +133,9 @@ Provides:
 - Full explainability with reasoning steps
 """
 try:
-from src.v8_analyzer import get_v8_analyzer, PartyPosition as PP
+from src.v8_analyzer import get_v8_analyzer
 analyzer = get_v8_analyzer()
-# Map party position
-party_map = {
-"BUYER": PP.BUYER,
-"SELLER": PP.SELLER,
-"NEUTRAL": PP.NEUTRAL
-}
-party = party_map.get(request.party_position.value, PP.NEUTRAL)
+party = request.party_position
 # Run analysis
 result = analyzer.analyze_clause(
 clause_text=request.clause_text,
@@ -206,15 +199,9 @@ Provides:
 - Individual clause analyses
 """
 try:
-from src.v8_analyzer import get_v8_analyzer, PartyPosition as PP
+from src.v8_analyzer import get_v8_analyzer
 analyzer = get_v8_analyzer()
-# Map party position
-party_map = {
-"BUYER": PP.BUYER,
-"SELLER": PP.SELLER,
-"NEUTRAL": PP.NEUTRAL
-}
-party = party_map.get(request.party_position.value, PP.NEUTRAL)
+party = request.party_position
 # Run analysis
 result = analyzer.analyze_contract(
 clauses=request.clauses,
@@ -252,19 +239,13 @@ jurisdiction: str = "UK"
 ):
 """Quick risk assessment for a clause."""
 try:
-from src.v8_analyzer import get_v8_analyzer, PartyPosition as PP
+from src.v8_analyzer import get_v8_analyzer
 from src.risk_model_v8 import get_clause_calculator
 analyzer = get_v8_analyzer()
 calculator = get_clause_calculator()
 # Classify first
 clause_type, category, _ = analyzer.classify_clause(clause_text)
-# Map party
-party_map = {
-"BUYER": PP.BUYER,
-"SELLER": PP.SELLER,
-"NEUTRAL": PP.NEUTRAL
-}
-party = party_map.get(party_position.value, PP.NEUTRAL)
+party = party_position
 # Calculate risk
 risk_data = calculator.calculate(clause_type, party, jurisdiction)
 return risk_data
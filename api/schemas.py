@@ -5,7 +5,12 @@ Pydantic models for API validation and documentation.
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
+# ==================== REQUEST LIMITS ====================
+# Enforced during validation (422 before any handler runs)
+MAX_CLAUSE_CHARS = 100_000 # per clause
+MAX_BULK_CLAUSES = 500 # clauses per bulk / contract request
+MAX_BULK_CHARS = 2_000_000 # total clause text per bulk request
 # ==================== ENUMS ====================
 class Jurisdiction(str, Enum):
 FRANCE = "FRANCE"
@@ -85,7 +90,7 @@ risk_reduction: int = Field(..., description="Estimated risk reduction in %")
 class AnalysisResponse(BaseModel):
 """Full analysis response."""
 id: str = Field(..., description="Analysis ID for reference")
-timestamp: datetime = Field(default_factory=datetime.utcnow)
+timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 # Core Results
 verdict: ExplainableVerdictResponse
 # Optional: Harmonization
@@ -99,7 +104,7 @@ class TrialTranscriptEntry(BaseModel):
 """Single entry in mock trial transcript."""
 speaker: str = Field(..., description="PLAINTIFF, DEFENSE, or JUDGE")
 content: str = Field(..., description="The argument or ruling")
-timestamp: datetime = Field(default_factory=datetime.utcnow)
+timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 class TrialSimulationResponse(BaseModel):
 """Mock trial simulation result."""
 id: str = Field(..., description="Simulation ID")
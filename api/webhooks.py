@@ -4,16 +4,34 @@ Event-driven notifications and third-party integrations.
 """
 import os
 import json
+import time
+import uuid
+import socket
 import hmac
 import hashlib
+import binascii
+import random
 import asyncio
 import aiohttp
-from datetime import datetime
-from typing import Dict, Any, List, Optional, Callable
-from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from dataclasses import dataclass, asdict, field
+from collections import defaultdict
 from enum import Enum
 from src.logger import setup_logger
+from src import jsonio
 logger = setup_logger("bale_webhooks")
+# HTTP/2 delivery via httpx (needs the h2 extra); aiohttp is the fallback
+try:
+import httpx
+import h2 # noqa: F401
+HTTP2_AVAILABLE = True
+except ImportError:
+HTTP2_AVAILABLE = False
+# Errors worth retrying: the request may succeed on a later attempt
+_TRANSPORT_ERRORS: Tuple[type, ...] = (aiohttp.ClientError, asyncio.TimeoutError)
+if HTTP2_AVAILABLE:
+_TRANSPORT_ERRORS += (httpx.TransportError,)
 # ==================== EVENT TYPES ====================
 class EventType(str, Enum):
 """Webhook event types."""
@@ -31,6 +49,15 @@ CONTRACT_DELETED = "contract.deleted"
 # System events
 SYSTEM_HEALTH_WARNING = "system.health_warning"
 QUOTA_WARNING = "quota.warning"
+# Bit position of each event type in WebhookEndpoint.event_mask
+EVENT_BITS: Dict[EventType, int] = {ev: i for i, ev in enumerate(EventType)}
+_EVENT_BY_VALUE: Dict[str, EventType] = {ev.value: ev for ev in EventType}
+def event_mask(events: List[EventType]) -> int:
+"""Fold a list of event types into a subscription bitmask."""
+mask = 0
+for event_type in events:
+mask |= 1 << EVENT_BITS[event_type]
+return mask
 @dataclass
 class WebhookEvent:
 """A webhook event to be delivered."""
@@ -59,110 +86,474 @@ active: bool = True
 created_at: str = None
 last_triggered_at: str = None
 failure_count: int = 0
+# Internal subscription bitmask over EVENT_BITS, derived from events here
+# and again on (re-)registration: edit .events, then re-register
+event_mask: int = field(init=False, repr=False, default=0)
+def __post_init__(self):
+self.event_mask = event_mask(self.events)
+def to_dict(self) -> Dict[str, Any]:
+"""Public endpoint fields, without the internal event mask."""
+data = asdict(self)
+del data["event_mask"]
+return data
+# ==================== PAYLOAD ENCODING ====================
+def encode_event(event: WebhookEvent) -> bytes:
+"""Encode an event as the JSON request body (the dataclass is serialized directly)."""
+return jsonio.dumps(event)
+# (second, ISO string) of the last bookkeeping timestamp
+_ts_cache = (0, "")
+def _iso_now() -> str:
+"""
+UTC ISO timestamp at 1-second granularity, formatted once per second.
+Used for endpoint bookkeeping; event timestamps keep full precision.
+"""
+global _ts_cache
+now = int(time.time())
+if now != _ts_cache[0]:
+_ts_cache = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+return _ts_cache[1]
+def _event_headers(event_type: str, event_id: str) -> Dict[str, str]:
+"""Headers shared by every delivery of one event (signature added per endpoint)."""
+return {
+"Content-Type": "application/json",
+"X-BALE-Event": event_type,
+"X-BALE-Delivery": event_id
+}
 # ==================== SIGNATURE GENERATION ====================
-def generate_signature(payload: str, secret: str) -> str:
-"""Generate HMAC-SHA256 signature for webhook payload."""
-return hmac.new(
-secret.encode('utf-8'),
-payload.encode('utf-8'),
-hashlib.sha256
-).hexdigest()
-def verify_signature(payload: str, secret: str, signature: str) -> bool:
-"""Verify webhook signature."""
-expected = generate_signature(payload, secret)
-return hmac.compare_digest(expected, signature)
+def generate_signature(payload: bytes, secret: bytes) -> bytes:
+"""
+Generate HMAC-SHA256 signature for webhook payload.
+Returns the raw digest; hex encoding only happens at the HTTP header
+boundary (see format_signature).
+"""
+return hmac.new(secret, payload, hashlib.sha256).digest()
+def format_signature(digest: bytes) -> str:
+"""Hex-encode a raw signature digest for the X-BALE-Signature header."""
+return binascii.hexlify(digest).decode('ascii')
+def verify_signature(payload: bytes, secret: bytes, signature: str) -> bool:
+"""Verify a hex X-BALE-Signature header in constant time on raw digests."""
+try:
+received = binascii.unhexlify(signature)
+except (binascii.Error, ValueError):
+return False
+return hmac.compare_digest(generate_signature(payload, secret), received)
 # ==================== WEBHOOK DISPATCHER ====================
+MAX_RETRY_DELAY = 30 # seconds
+# Dead-letter queue for deliveries that exhausted their inline retries.
+# Entries are retried slowly (5min, 30min, 2h, 12h) by a background worker,
+# then moved to the failed list for inspection.
+# Each process drains into its own in-flight list and holds a lease while
+# alive; in-flight entries are only requeued once their owner's lease expires.
+WEBHOOK_DLQ_KEY = "bale:webhook:dlq"
+WEBHOOK_DLQ_INFLIGHT_KEY = "bale:webhook:dlq:inflight" # + ":<instance id>"
+WEBHOOK_DLQ_LEASE_KEY = "bale:webhook:dlq:lease" # + ":<instance id>"
+WEBHOOK_DLQ_OWNERS_KEY = "bale:webhook:dlq:owners"
+WEBHOOK_FAILED_KEY = "bale:webhook:failed"
+DLQ_RETRY_DELAYS = (300, 1800, 7200, 43200) # seconds
+DELIVERY_DEDUP_TTL = 300 # seconds an (endpoint, event) pair stays claimed
+DLQ_POLL_INTERVAL = 30 # seconds
+DLQ_LEASE_TTL = 3 * DLQ_POLL_INTERVAL # seconds, refreshed every poll and entry
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+"""Parse a delta-seconds Retry-After header (HTTP-date form is ignored)."""
+if not value:
+return None
+try:
+return min(max(float(value), 0.0), MAX_RETRY_DELAY)
+except ValueError:
+return None
 class WebhookDispatcher:
 """
 Manages webhook endpoints and event delivery.
 """
 def __init__(self):
 self.endpoints: Dict[str, WebhookEndpoint] = {}
-self.event_handlers: Dict[EventType, List[Callable]] = {}
+# Active endpoints indexed by event type: event -> {endpoint_id: endpoint}
+self._by_event: Dict[EventType, Dict[str, WebhookEndpoint]] = defaultdict(dict)
+# In-process handlers split by kind at registration, so dispatch never introspects
+self._sync_handlers: Dict[EventType, List[Callable]] = {}
+self._async_handlers: Dict[EventType, List[Callable]] = {}
 self._session: Optional[aiohttp.ClientSession] = None
+self._client = None # httpx.AsyncClient when HTTP2_AVAILABLE
+# Keyed HMAC prototypes per endpoint secret (copied per delivery)
+self._hmac_cache: Dict[str, hmac.HMAC] = {}
+# Bounds in-flight POSTs across all fan-outs
+self._sem = asyncio.Semaphore(64)
+# Background delivery queue fed by emit_event (see start())
+self._queue: Optional[asyncio.Queue] = None
+self._loop: Optional[asyncio.AbstractEventLoop] = None
+self._workers: List[asyncio.Task] = []
+# (endpoint_id, event_id) -> dedup deadline; guards against the same
+# event being fanned out twice (receivers can also dedup on X-BALE-Delivery)
+self._inflight: Dict[Tuple[str, str], float] = {}
+self._inflight_inserts = 0
+# Async Redis client for the DLQ (redis.asyncio), created on first use
+self._redis = None
+self._instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+self._dlq_inflight_key = f"{WEBHOOK_DLQ_INFLIGHT_KEY}:{self._instance_id}"
+self._dlq_lease_key = f"{WEBHOOK_DLQ_LEASE_KEY}:{self._instance_id}"
 async def _get_session(self) -> aiohttp.ClientSession:
 if self._session is None or self._session.closed:
 timeout = aiohttp.ClientTimeout(total=10)
-self._session = aiohttp.ClientSession(timeout=timeout)
+connector = aiohttp.TCPConnector(limit=100, limit_per_host=10, ttl_dns_cache=300)
+self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
 return self._session
+def _get_client(self) -> "httpx.AsyncClient":
+# One multiplexed HTTP/2 connection per host serves concurrent deliveries
+if self._client is None or self._client.is_closed:
+self._client = httpx.AsyncClient(
+http2=True,
+timeout=10.0,
+limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+return self._client
+async def _post(
+self, url: str, payload: bytes, headers: Dict[str, str]
+) -> Tuple[int, Optional[str]]:
+"""POST a payload; returns (status, Retry-After header)."""
+async with self._sem:
+if HTTP2_AVAILABLE:
+response = await self._get_client().post(url, content=payload, headers=headers)
+return response.status_code, response.headers.get("Retry-After")
+session = await self._get_session()
+async with session.post(url, data=payload, headers=headers) as response:
+return response.status, response.headers.get("Retry-After")
 async def close(self):
+"""Stop the workers, park undelivered events in the DLQ, then close transports."""
+workers, self._workers = self._workers, []
+for task in workers:
+task.cancel()
+# Let in-flight POSTs unwind before their session/client is closed
+await asyncio.gather(*workers, return_exceptions=True)
+self._loop = None # later enqueue() calls drop with a warning
+pending = []
+while self._queue is not None and not self._queue.empty():
+pending.append(self._queue.get_nowait())
+if pending:
+logger.warning(f"Webhook dispatcher closing with {len(pending)} queued events; moving them to the DLQ")
+for event in pending:
+endpoints = list(self._by_event.get(event.type, {}).values())
+if endpoints:
+payload = encode_event(event)
+event_headers = _event_headers(event.type.value, event.id)
+for endpoint in endpoints:
+await self._dlq_push(payload, event_headers, endpoint, "dispatcher closed before delivery")
 if self._session and not self._session.closed:
 await self._session.close()
+if self._client is not None and not self._client.is_closed:
+await self._client.aclose()
+if self._redis is not None:
+await self._redis.aclose()
+self._redis = None
+async def start(self, num_workers: int = 4, max_queue: int = 10000):
+"""Start the background workers that deliver queued events."""
+if self._workers:
+return
+self._loop = asyncio.get_running_loop()
+self._queue = asyncio.Queue(maxsize=max_queue)
+self._workers = [
+asyncio.create_task(self._worker()) for _ in range(num_workers)
+]
+self._workers.append(asyncio.create_task(self._dlq_worker()))
+logger.info(f"Webhook workers started: {num_workers}")
+async def _worker(self):
+while True:
+event = await self._queue.get()
+try:
+await self.dispatch(event)
+except Exception as e:
+logger.error(f"Webhook worker error: {e}")
+finally:
+self._queue.task_done()
+def enqueue(self, event: WebhookEvent) -> bool:
+"""
+Queue an event for background dispatch.
+Safe to call from any thread; events are dropped (with a warning)
+when the workers are not running or the queue is full.
+"""
+if self._loop is None or self._loop.is_closed():
+logger.warning(f"Webhook workers not running, dropping event {event.id}")
+return False
+self._loop.call_soon_threadsafe(self._put_nowait, event)
+return True
+def _put_nowait(self, event: WebhookEvent):
+try:
+self._queue.put_nowait(event)
+except asyncio.QueueFull:
+logger.warning(f"Webhook queue full, dropping event {event.id}")
+def _sign(self, secret: str, payload: bytes) -> bytes:
+"""HMAC-SHA256 digest reusing the keyed state for this secret."""
+proto = self._hmac_cache.get(secret)
+if proto is None:
+if len(self._hmac_cache) >= 1024: # secrets rotated away
+self._hmac_cache.clear()
+proto = hmac.new(secret.encode('utf-8'), b'', hashlib.sha256)
+self._hmac_cache[secret] = proto
+h = proto.copy()
+h.update(payload)
+return h.digest()
 def register_endpoint(self, endpoint: WebhookEndpoint):
 """Register a new webhook endpoint."""
+if endpoint.id in self.endpoints:
+self._unindex(self.endpoints[endpoint.id])
+endpoint.event_mask = event_mask(endpoint.events)
 self.endpoints[endpoint.id] = endpoint
+if endpoint.active:
+self._index(endpoint)
 logger.info(f"Registered webhook endpoint: {endpoint.id} -> {endpoint.url}")
 def unregister_endpoint(self, endpoint_id: str):
 """Remove a webhook endpoint."""
 if endpoint_id in self.endpoints:
-del self.endpoints[endpoint_id]
+self._unindex(self.endpoints.pop(endpoint_id))
 logger.info(f"Unregistered webhook endpoint: {endpoint_id}")
+def _index(self, endpoint: WebhookEndpoint):
+mask = endpoint.event_mask
+for event_type, bit in EVENT_BITS.items():
+if mask >> bit & 1:
+self._by_event[event_type][endpoint.id] = endpoint
+def _unindex(self, endpoint: WebhookEndpoint):
+# Driven by the registered mask, so later edits to .events can't strand entries
+mask = endpoint.event_mask
+for event_type, bit in EVENT_BITS.items():
+if mask >> bit & 1:
+self._by_event.get(event_type, {}).pop(endpoint.id, None)
+@property
+def event_handlers(self) -> Dict[EventType, List[Callable]]:
+"""Registered in-process handlers per event type (sync first, then async)."""
+return {
+event_type: self._sync_handlers.get(event_type, []) + self._async_handlers.get(event_type, [])
+for event_type in {**self._sync_handlers, **self._async_handlers}
+}
 def register_handler(self, event_type: EventType, handler: Callable):
 """Register an in-process event handler."""
-if event_type not in self.event_handlers:
-self.event_handlers[event_type] = []
-self.event_handlers[event_type].append(handler)
+bucket = self._async_handlers if asyncio.iscoroutinefunction(handler) else self._sync_handlers
+bucket.setdefault(event_type, []).append(handler)
 async def dispatch(self, event: WebhookEvent):
 """Dispatch an event to all matching endpoints and handlers."""
 # Call in-process handlers
-handlers = self.event_handlers.get(event.type, [])
-for handler in handlers:
+for handler in self._sync_handlers.get(event.type, ()):
 try:
-if asyncio.iscoroutinefunction(handler):
-await handler(event)
-else:
 handler(event)
 except Exception as e:
 logger.error(f"Handler error for {event.type}: {e}")
+async_handlers = self._async_handlers.get(event.type)
+if async_handlers:
+results = await asyncio.gather(
+*(handler(event) for handler in async_handlers),
+return_exceptions=True
+)
+for result in results:
+if isinstance(result, Exception):
+logger.error(f"Handler error for {event.type}: {result}")
 # Send to webhook endpoints
-matching_endpoints = [
-ep for ep in self.endpoints.values()
-if ep.active and event.type in ep.events
-]
+# Only active endpoints are indexed, so no per-endpoint filtering here
+matching_endpoints = list(self._by_event.get(event.type, {}).values())
 if matching_endpoints:
+# Serialize once per event, not once per endpoint
+payload = encode_event(event)
+event_headers = _event_headers(event.type.value, event.id)
 await asyncio.gather(*[
-self._deliver_to_endpoint(event, ep)
+self._deliver_to_endpoint(payload, event_headers, ep)
 for ep in matching_endpoints
 ], return_exceptions=True)
 async def _deliver_to_endpoint(
-self, event: WebhookEvent, endpoint: WebhookEndpoint
+self,
+payload: bytes,
+event_headers: Dict[str, str],
+endpoint: WebhookEndpoint
 ):
-"""Deliver an event to a single endpoint with retries."""
-payload = json.dumps(event.to_dict())
-signature = generate_signature(payload, endpoint.secret)
-headers = {
-"Content-Type": "application/json",
-"X-BALE-Signature": signature,
-"X-BALE-Event": event.type.value,
-"X-BALE-Delivery": event.id
-}
-session = await self._get_session()
+"""Deliver a pre-encoded event payload to a single endpoint with retries."""
+if not self._claim_delivery(endpoint.id, event_headers["X-BALE-Delivery"]):
+logger.debug(f"Skipping duplicate delivery {event_headers['X-BALE-Delivery']} -> {endpoint.url}")
+return
+headers = self._signed_headers(event_headers, payload, endpoint)
+event_type = event_headers["X-BALE-Event"]
+last_error = None
 for attempt in range(3): # 3 retries
+retry_after = None
 try:
-async with session.post(
-endpoint.url,
-data=payload,
-headers=headers
-) as response:
-if response.status < 300:
-endpoint.last_triggered_at = datetime.utcnow().isoformat()
+status, retry_after_header = await self._post(endpoint.url, payload, headers)
+if status < 300:
+endpoint.last_triggered_at = _iso_now()
 endpoint.failure_count = 0
-logger.info(f"Webhook delivered: {event.type} -> {endpoint.url}")
+logger.info(f"Webhook delivered: {event_type} -> {endpoint.url}")
 return
-else:
+elif status == 429 or 500 <= status < 600:
 logger.warning(
 f"Webhook delivery failed: {endpoint.url} "
-f"returned {response.status}"
+f"returned {status}, retrying"
 )
-except Exception as e:
+last_error = f"HTTP {status}"
+if status == 429:
+retry_after = _retry_after_seconds(retry_after_header)
+else:
+# Other statuses will not succeed on retry
+logger.warning(
+f"Webhook delivery rejected: {endpoint.url} "
+f"returned {status}"
+)
+self._record_failure(endpoint)
+return
+except _TRANSPORT_ERRORS as e:
 logger.error(f"Webhook delivery error: {e}")
-# Exponential backoff
+last_error = str(e) or type(e).__name__
+except Exception as e:
+logger.error(f"Webhook delivery aborted: {e}")
+self._record_failure(endpoint)
+return
+# Exponential backoff with jitter, unless the server asked for a delay
 if attempt < 2:
-await asyncio.sleep(2 ** attempt)
-# All retries failed
+if retry_after is not None:
+await asyncio.sleep(retry_after)
+else:
+delay = min(MAX_RETRY_DELAY, 2 ** attempt)
+await asyncio.sleep(random.uniform(delay * 0.5, delay * 1.5))
+# All retries failed: hand over to the slow retry queue
+self._record_failure(endpoint)
+await self._dlq_push(payload, event_headers, endpoint, last_error)
+def _claim_delivery(self, endpoint_id: str, event_id: str) -> bool:
+"""Claim an (endpoint, event) pair; False if it was claimed within the TTL."""
+key = (endpoint_id, event_id)
+now = time.monotonic()
+if self._inflight.get(key, 0) > now:
+return False
+self._inflight[key] = now + DELIVERY_DEDUP_TTL
+self._inflight_inserts += 1
+if self._inflight_inserts >= 1024:
+# Lazy sweep of expired claims
+self._inflight_inserts = 0
+self._inflight = {k: d for k, d in self._inflight.items() if d > now}
+return True
+def _signed_headers(
+self,
+event_headers: Dict[str, str],
+payload: bytes,
+endpoint: WebhookEndpoint
+) -> Dict[str, str]:
+# Per-event headers are shared; only the signature varies per endpoint
+headers = event_headers.copy()
+headers["X-BALE-Signature"] = format_signature(self._sign(endpoint.secret, payload))
+return headers
+# ---------- Dead-letter queue ----------
+def _get_redis(self):
+"""Async Redis client for the DLQ; None when the redis package is missing."""
+if self._redis is None:
+try:
+import redis.asyncio as aioredis
+except ImportError:
+return None
+from api.cache import cache
+self._redis = aioredis.from_url(cache.url, encoding="utf-8", decode_responses=True)
+return self._redis
+async def _dlq_push(
+self,
+payload: bytes,
+event_headers: Dict[str, str],
+endpoint: WebhookEndpoint,
+error: Optional[str]
+):
+"""Persist a failed delivery for slow retry."""
+event_id = event_headers["X-BALE-Delivery"]
+entry = json.dumps({
+"payload": payload.decode("utf-8"),
+"event_type": event_headers["X-BALE-Event"],
+"event_id": event_id,
+"endpoint_id": endpoint.id,
+"last_error": error,
+"attempts": 0,
+"next_attempt_at": time.time() + DLQ_RETRY_DELAYS[0]
+})
+redis = self._get_redis()
+try:
+if redis is None:
+raise ConnectionError("redis package not installed")
+await redis.lpush(WEBHOOK_DLQ_KEY, entry)
+except Exception as e:
+logger.error(f"Webhook DLQ unavailable ({e}), dropping {event_id} -> {endpoint.url}")
+async def _renew_lease(self, redis):
+"""Mark this process alive so its in-flight entries are left alone."""
+await redis.set(self._dlq_lease_key, "1", ex=DLQ_LEASE_TTL)
+await redis.sadd(WEBHOOK_DLQ_OWNERS_KEY, self._instance_id)
+async def _recover_orphans(self, redis):
+"""Requeue entries left in flight by processes whose lease has expired."""
+for owner in await redis.smembers(WEBHOOK_DLQ_OWNERS_KEY):
+if owner == self._instance_id or await redis.exists(f"{WEBHOOK_DLQ_LEASE_KEY}:{owner}"):
+continue
+inflight = f"{WEBHOOK_DLQ_INFLIGHT_KEY}:{owner}"
+while await redis.rpoplpush(inflight, WEBHOOK_DLQ_KEY) is not None:
+pass
+await redis.srem(WEBHOOK_DLQ_OWNERS_KEY, owner)
+logger.info(f"Requeued webhook DLQ entries of expired worker {owner}")
+async def _dlq_worker(self):
+redis = self._get_redis()
+if redis is None:
+logger.warning("redis package not installed, webhook DLQ retries disabled")
+return
+while True:
+try:
+await self._renew_lease(redis)
+await self._recover_orphans(redis)
+await self._drain_dlq()
+except Exception as e:
+logger.error(f"Webhook DLQ worker error: {e}")
+await asyncio.sleep(DLQ_POLL_INTERVAL)
+async def _drain_dlq(self):
+"""One pass over the DLQ, retrying entries that are due."""
+redis = self._get_redis()
+inflight = self._dlq_inflight_key
+for _ in range(await redis.llen(WEBHOOK_DLQ_KEY)):
+raw = await redis.rpoplpush(WEBHOOK_DLQ_KEY, inflight)
+if raw is None:
+break
+entry = json.loads(raw)
+if entry["next_attempt_at"] > time.time():
+await redis.lpush(WEBHOOK_DLQ_KEY, raw)
+else:
+# Redelivery can take up to the HTTP timeout; keep the lease alive
+await self._renew_lease(redis)
+error = await self._redeliver(entry)
+if error is None:
+logger.info(f"Webhook redelivered from DLQ: {entry['event_id']}")
+else:
+entry["attempts"] += 1
+entry["last_error"] = error
+if entry["attempts"] >= len(DLQ_RETRY_DELAYS):
+await redis.lpush(WEBHOOK_FAILED_KEY, json.dumps(entry))
+await redis.ltrim(WEBHOOK_FAILED_KEY, 0, 9999)
+logger.warning(
+f"Webhook delivery abandoned: {entry['event_id']} "
+f"-> {entry['endpoint_id']} ({error})"
+)
+else:
+entry["next_attempt_at"] = time.time() + DLQ_RETRY_DELAYS[entry["attempts"]]
+await redis.lpush(WEBHOOK_DLQ_KEY, json.dumps(entry))
+await redis.lrem(inflight, 1, raw)
+async def _redeliver(self, entry: Dict[str, Any]) -> Optional[str]:
+"""Single delivery attempt for a DLQ entry; returns an error or None."""
+endpoint = self.endpoints.get(entry["endpoint_id"])
+if endpoint is None:
+return "endpoint unregistered"
+event_type = _EVENT_BY_VALUE.get(entry["event_type"])
+if event_type is None or not endpoint.event_mask >> EVENT_BITS[event_type] & 1:
+return "endpoint unsubscribed"
+payload = entry["payload"].encode("utf-8")
+headers = self._signed_headers(
+_event_headers(entry["event_type"], entry["event_id"]), payload, endpoint
+)
+try:
+status, _ = await self._post(endpoint.url, payload, headers)
+except _TRANSPORT_ERRORS as e:
+return str(e) or type(e).__name__
+if status < 300:
+endpoint.last_triggered_at = _iso_now()
+endpoint.failure_count = 0
+return None
+return f"HTTP {status}"
+def _record_failure(self, endpoint: WebhookEndpoint):
+"""Count a failed delivery; disable the endpoint after 5 in a row."""
 endpoint.failure_count += 1
 if endpoint.failure_count >= 5:
 endpoint.active = False
+self._unindex(endpoint)
 logger.warning(f"Webhook disabled after failures: {endpoint.url}")
 # Global dispatcher instance
 dispatcher = WebhookDispatcher()
@@ -174,18 +565,19 @@ user_id: str = None
 ):
 """
 Synchronously queue an event for dispatch.
-Use in non-async contexts.
+Use in non-async contexts. Delivery happens on the dispatcher's
+background workers, started from the API lifespan.
 """
 import uuid
 event = WebhookEvent(
 id=str(uuid.uuid4()),
 type=event_type,
-timestamp=datetime.utcnow().isoformat(),
+timestamp=datetime.now(timezone.utc).isoformat(),
 data=data,
 user_id=user_id
 )
 # Fire and forget
-asyncio.create_task(dispatcher.dispatch(event))
+dispatcher.enqueue(event)
 async def emit_event_async(
 event_type: EventType,
 data: Dict[str, Any],
@@ -196,16 +588,73 @@ import uuid
 event = WebhookEvent(
 id=str(uuid.uuid4()),
 type=event_type,
-timestamp=datetime.utcnow().isoformat(),
+timestamp=datetime.now(timezone.utc).isoformat(),
 data=data,
 user_id=user_id
 )
 await dispatcher.dispatch(event)
 # ==================== SLACK INTEGRATION ====================
+SLACK_BATCH_WINDOW = 0.5 # seconds to wait for adjacent alerts
+SLACK_BATCH_SIZE = 20 # alerts per flush
+SLACK_MAX_BLOCKS = 50 # Slack's per-message block limit
+# Static parts of the risk alert blocks; only the text fields vary per alert
+_ALERT_HEADER = {"type": "header"}
+_ALERT_SECTION = {"type": "section"}
+_ALERT_VIEW_BUTTON = {"type": "button", "text": {"type": "plain_text", "text": "View Analysis"}}
+def _risk_alert_blocks(
+contract_name: str,
+risk_score: int,
+clause_summary: str,
+analysis_url: str = None
+) -> List[Dict]:
+critical = risk_score > 70
+blocks = [
+{**_ALERT_HEADER, "text": {"type": "plain_text", "text": f" High Risk Alert: {contract_name}"}},
+{**_ALERT_SECTION, "fields": [
+{"type": "mrkdwn", "text": f"*Risk Score:*\n{risk_score}%"},
+{"type": "mrkdwn", "text": f"*Status:*\n{' Critical' if critical else ' Warning'}"}
+]},
+{**_ALERT_SECTION, "text": {"type": "mrkdwn", "text": f"*Clause Summary:*\n{clause_summary[:200]}..."}}
+]
+if analysis_url:
+blocks.append({"type": "actions", "elements": [{**_ALERT_VIEW_BUTTON, "url": analysis_url}]})
+return blocks
 class SlackNotifier:
 """Send notifications to Slack."""
 def __init__(self, webhook_url: str = None):
 self.webhook_url = webhook_url or os.getenv("SLACK_WEBHOOK_URL")
+self._session: Optional[aiohttp.ClientSession] = None
+# Alert batching (see start / queue_risk_alert)
+self._queue: Optional[asyncio.Queue] = None
+self._worker_task: Optional[asyncio.Task] = None
+async def _get_session(self) -> aiohttp.ClientSession:
+if self._session is None or self._session.closed:
+timeout = aiohttp.ClientTimeout(total=10)
+connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60)
+self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+return self._session
+async def start(self, max_queue: int = 1000):
+"""Start the background task that batches queued risk alerts."""
+if self._worker_task:
+return
+self._queue = asyncio.Queue(maxsize=max_queue)
+self._worker_task = asyncio.create_task(self._batch_worker())
+async def close(self):
+if self._worker_task:
+self._worker_task.cancel()
+try:
+await self._worker_task
+except asyncio.CancelledError:
+pass
+self._worker_task = None
+# Flush whatever was still waiting for its batch window
+pending = []
+while self._queue is not None and not self._queue.empty():
+pending.append(self._queue.get_nowait())
+if pending:
+await self.send_batch(pending)
+if self._session and not self._session.closed:
+await self._session.close()
 async def send(
 self,
 message: str,
@@ -221,8 +670,8 @@ if channel:
 payload["channel"] = channel
 if blocks:
 payload["blocks"] = blocks
-async with aiohttp.ClientSession() as session:
 try:
+session = await self._get_session()
 async with session.post(
 self.webhook_url,
 json=payload
@@ -241,43 +690,65 @@ clause_summary: str,
 analysis_url: str = None
 ):
 """Send a formatted risk alert."""
-color = "#ef4444" if risk_score > 70 else "#f59e0b" if risk_score > 50 else "#10b981"
-blocks = [
-{
-"type": "header",
-"text": {
-"type": "plain_text",
-"text": f" High Risk Alert: {contract_name}"
-}
-},
-{
-"type": "section",
-"fields": [
-{"type": "mrkdwn", "text": f"*Risk Score:*\n{risk_score}%"},
-{"type": "mrkdwn", "text": f"*Status:*\n{' Critical' if risk_score > 70 else ' Warning'}"}
-]
-},
-{
-"type": "section",
-"text": {
-"type": "mrkdwn",
-"text": f"*Clause Summary:*\n{clause_summary[:200]}..."
-}
-}
-]
-if analysis_url:
-blocks.append({
-"type": "actions",
-"elements": [{
-"type": "button",
-"text": {"type": "plain_text", "text": "View Analysis"},
-"url": analysis_url
-}]
-})
 await self.send(
 message=f"High risk detected: {contract_name} ({risk_score}%)",
-blocks=blocks
+blocks=_risk_alert_blocks(contract_name, risk_score, clause_summary, analysis_url)
 )
+def queue_risk_alert(
+self,
+contract_name: str,
+risk_score: int,
+clause_summary: str,
+analysis_url: str = None
+) -> bool:
+"""
+Queue a risk alert to be sent with any others raised in the same
+batch window. Returns False if batching is not running or the queue is full.
+"""
+if self._queue is None or self._worker_task is None:
+logger.warning(f"Slack batching not running, dropping alert for {contract_name}")
+return False
+try:
+self._queue.put_nowait({
+"contract_name": contract_name,
+"risk_score": risk_score,
+"clause_summary": clause_summary,
+"analysis_url": analysis_url,
+})
+except asyncio.QueueFull:
+logger.warning(f"Slack alert queue full, dropping alert for {contract_name}")
+return False
+return True
+async def send_batch(self, alerts: List[Dict[str, Any]]):
+"""Send several risk alerts in as few Slack messages as the block limit allows."""
+blocks: List[Dict] = []
+count = 0
+for alert in alerts:
+alert_blocks = _risk_alert_blocks(**alert)
+if blocks and len(blocks) + len(alert_blocks) > SLACK_MAX_BLOCKS:
+await self.send(message=f"{count} high risk alerts", blocks=blocks)
+blocks, count = [], 0
+blocks.extend(alert_blocks)
+count += 1
+if blocks:
+await self.send(message=f"{count} high risk alerts", blocks=blocks)
+async def _batch_worker(self):
+loop = asyncio.get_running_loop()
+while True:
+batch = [await self._queue.get()]
+deadline = loop.time() + SLACK_BATCH_WINDOW
+while len(batch) < SLACK_BATCH_SIZE:
+remaining = deadline - loop.time()
+if remaining <= 0:
+break
+try:
+batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+except asyncio.TimeoutError:
+break
+try:
+await self.send_batch(batch)
+except Exception as e:
+logger.error(f"Slack batch error: {e}")
 # ==================== EMAIL INTEGRATION ====================
 class EmailNotifier:
 """Send email notifications via SMTP or API."""
@@ -1,22 +1,84 @@
 import streamlit as st
 import os
-import tempfile
+import hashlib
+import threading
 import json
+from dataclasses import dataclass
+from typing import Any, Dict, Final, Optional, Tuple
 import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from dotenv import load_dotenv
 load_dotenv()
-from src.ingestion import PDFProcessor
-from src.v10.pipeline import V10Pipeline
 st.set_page_config(page_title="BALE V10 - Contract Intelligence", page_icon="///", layout="wide")
-def load_css(file_path):
+@st.cache_data(show_spinner=False)
+def read_css(file_path, mtime):
+# mtime is part of the cache key so edits to the stylesheet still show up
 with open(file_path) as f:
-st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+return f.read()
+def load_css(file_path):
+st.markdown(f"<style>{read_css(file_path, os.path.getmtime(file_path))}</style>", unsafe_allow_html=True)
 load_css("assets/style.css")
+# Heavy modules (pdfplumber, the V10 models) are imported on first use, so
+# reruns that never analyse a contract don't pay for them
+@st.cache_resource
+def get_processor():
+from src.ingestion import PDFProcessor
+return PDFProcessor()
+@st.cache_resource
+def get_pipeline():
+from src.v10.pipeline import V10Pipeline
+return V10Pipeline(multilingual=True)
+@st.cache_data(show_spinner=False)
+def extract_contract_text(file_hash: str, _upload) -> str:
+# Keyed on the content hash; pdfplumber reads the in-memory upload directly,
+# so no temp file is written or unlinked
+_upload.seek(0)
+return get_processor().extract_layout_aware_text(_upload)
 # --- Chart Helpers ---
-def create_risk_gauge(risk_score, risk_level):
+# Figures are built and serialized once per (hashable) input; reruns reuse the
+# cached JSON string and hand it straight to Plotly.js in the browser. The specs
+# below are fixed and known-good, so they are built from plain dicts with
+# _validate=False to skip Plotly's per-property schema checks.
+# Shared layout defaults, layered over Plotly's base template; helpers only set chart-specific fields
+pio.templates["bale"] = go.layout.Template(layout=dict(
+font=dict(family="Space Grotesk, sans-serif", color="black"),
+paper_bgcolor="rgba(0,0,0,0)",
+plot_bgcolor="rgba(0,0,0,0)",
+margin=dict(l=20, r=20, t=50, b=20),
+))
+pio.templates.default = "plotly+bale"
+# Plotly.js "finance" partial bundle (bar + indicator, no full build), fetched at
+# build time by scripts/fetch_plotly_bundle.py and served by Streamlit's static
+# file serving. Every chart iframe points at the same cacheable URL, so the
+# browser downloads and parses it once.
+PLOTLY_BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "plotly-finance.min.js")
+@st.cache_resource
+def plotly_js_tag():
+if not os.path.exists(PLOTLY_BUNDLE):
+return None
+base = st.get_option("server.baseUrlPath").strip("/")
+prefix = f"/{base}" if base else ""
+return f'<script src="{prefix}/app/static/plotly-finance.min.js" charset="utf-8"></script>'
+def figure_json(fig):
+# validate=False skips the schema walk; escape "</" so text can't close the script tag
+return pio.to_json(fig, validate=False).replace("</", "<\\/")
+def render_figure(fig_json, height):
+if plotly_js_tag() is None:
+# No vendored bundle (e.g. a dev checkout): Streamlit's own Plotly, loaded once per page
+st.plotly_chart(json.loads(fig_json), use_container_width=True)
+return
+components.html(
+f'<style>body {{ margin: 0; }}</style>{plotly_js_tag()}<div id="fig" style="height: {height}px;"></div>'
+f'<script>var fig = {fig_json}; Plotly.newPlot("fig", fig.data, fig.layout, {{"responsive": true}});</script>',
+height=height,
+)
+def risk_gauge_figure(risk_score, risk_level):
 color_map = {"HIGH": "#DC2626", "MEDIUM": "#F59E0B", "LOW": "#10B981"}
 bar_color = color_map.get(risk_level, "#6B7280")
-fig = go.Figure(go.Indicator(
+fig = go.Figure(data=[dict(
+type="indicator",
 mode="gauge+number",
 value=risk_score,
 title={"text": "CONTRACT RISK", "font": {"size": 14, "family": "Space Grotesk"}},
@@ -37,44 +99,51 @@ gauge={
 "value": 90,
 },
 },
-))
-fig.update_layout(
-paper_bgcolor="rgba(0,0,0,0)",
-height=250,
-margin=dict(l=20, r=20, t=50, b=20),
-font=dict(family="Space Grotesk, sans-serif", color="black"),
-)
+)], layout=dict(height=250), _validate=False)
 return fig
-def create_power_bar(power_data):
-parties = power_data.get("parties", [])
-if len(parties) < 2:
+@st.cache_data(show_spinner=False, max_entries=64)
+def create_risk_gauge(risk_score, risk_level):
+return figure_json(risk_gauge_figure(risk_score, risk_level))
+@st.cache_data(show_spinner=False, max_entries=64)
+def risk_gauge_png(risk_score, risk_level):
+"""Static PNG of the risk gauge, or None when no image engine (kaleido) is available."""
+try:
+return risk_gauge_figure(risk_score, risk_level).to_image(format="png", width=400, height=250, scale=2)
+except Exception:
 return None
-fig = go.Figure()
-fig.add_trace(go.Bar(
-name=parties[0]["name"],
+def party_bar_values(party):
+return (party["name"], party["obligations"], party["protections"], party["burden_score"])
+@st.cache_data(show_spinner=False, max_entries=64)
+def create_power_bar(party_a, party_b):
+"""party_a / party_b: (name, obligations, protections, burden_score) tuples."""
+fig = go.Figure(data=[
+dict(
+type="bar",
+name=party_a[0],
 x=["Obligations", "Protections", "Burden Score"],
-y=[parties[0]["obligations"], parties[0]["protections"], parties[0]["burden_score"]],
-marker_color="black",
-))
-fig.add_trace(go.Bar(
-name=parties[1]["name"],
+y=list(party_a[1:]),
+marker=dict(color="black"),
+),
+dict(
+type="bar",
+name=party_b[0],
 x=["Obligations", "Protections", "Burden Score"],
-y=[parties[1]["obligations"], parties[1]["protections"], parties[1]["burden_score"]],
-marker_color="#94A3B8",
-))
-fig.update_layout(
+y=list(party_b[1:]),
+marker=dict(color="#94A3B8"),
+),
+], layout=dict(
 barmode="group",
-paper_bgcolor="rgba(0,0,0,0)",
-plot_bgcolor="rgba(0,0,0,0)",
 height=280,
-margin=dict(l=20, r=20, t=20, b=40),
-font=dict(family="Space Grotesk, sans-serif", size=12, color="black"),
+margin=dict(t=20, b=40),
+font=dict(size=12),
 legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-)
-return fig
-def create_completeness_chart(graph_data):
-completeness = graph_data.get("completeness_score", 0) * 100
-fig = go.Figure(go.Indicator(
+), _validate=False)
+return figure_json(fig)
+@st.cache_data(show_spinner=False, max_entries=64)
+def create_completeness_chart(completeness_score):
+completeness = completeness_score * 100
+fig = go.Figure(data=[dict(
+type="indicator",
 mode="gauge+number",
 value=completeness,
 title={"text": "COMPLETENESS", "font": {"size": 14, "family": "Space Grotesk"}},
@@ -85,20 +154,81 @@ gauge={
 "borderwidth": 2,
 "bordercolor": "black",
 },
-))
-fig.update_layout(
-paper_bgcolor="rgba(0,0,0,0)",
-height=200,
-margin=dict(l=20, r=20, t=50, b=20),
+)], layout=dict(height=200), _validate=False)
+return figure_json(fig)
+# --- Report View ---
+@dataclass(frozen=True, slots=True)
+class ReportView:
+"""Report fields the dashboard reads, with defaults resolved once at save time."""
+risk_score: float
+risk_level: str
+executive_summary: str
+completeness_score: float
+conflicts: Tuple[Dict[str, Any], ...]
+missing_dependencies: Tuple[Dict[str, Any], ...]
+missing_expected: Tuple[Dict[str, Any], ...]
+power_parties: Optional[Tuple[tuple, tuple]]
+power_summary: str
+dispute_count_prediction: Any
+hotspots: Tuple[Dict[str, Any], ...]
+classifications: Tuple[Dict[str, Any], ...]
+@classmethod
+def from_report(cls, data: Dict[str, Any]) -> "ReportView":
+overall = data.get("overall", {})
+graph = data.get("graph_analysis", {})
+power = data.get("power_analysis", {})
+disputes = data.get("dispute_prediction", {})
+parties = power.get("parties", [])
+return cls(
+risk_score=overall.get("risk_score", 50),
+risk_level=overall.get("risk_level", "MEDIUM"),
+executive_summary=overall.get("executive_summary", ""),
+completeness_score=graph.get("completeness_score", 0),
+conflicts=tuple(graph.get("conflicts") or ()),
+missing_dependencies=tuple(graph.get("missing_dependencies") or ()),
+missing_expected=tuple((graph.get("missing_expected") or ())[:5]),
+power_parties=(party_bar_values(parties[0]), party_bar_values(parties[1])) if len(parties) >= 2 else None,
+power_summary=power.get("summary", ""),
+dispute_count_prediction=disputes.get("dispute_count_prediction", "N/A"),
+hotspots=tuple(disputes.get("hotspots", [])[:8]),
+classifications=tuple(data.get("classifications", [])[:10]),
 )
-return fig
-# --- Hero Section ---
-st.markdown("""
+def report_charts(view):
+"""Chart payloads for a report, built once per analysis and reused on later reruns."""
+cached = st.session_state.get("_charts")
+if cached is not None and cached[0] is view:
+return cached[1]
+gauge_png = risk_gauge_png(view.risk_score, view.risk_level)
+charts = {
+"completeness": create_completeness_chart(view.completeness_score),
+"power": create_power_bar(*view.power_parties) if view.power_parties else None,
+"gauge_png": gauge_png,
+"gauge": None if gauge_png else create_risk_gauge(view.risk_score, view.risk_level),
+}
+st.session_state._charts = (view, charts)
+return charts
+# --- Static HTML (input-independent, built once at import) ---
+_HERO_HTML: Final = """
 <div class="hero-container">
 <span class="hero-prefix">///</span>
 <span class="hero-title">Contract Intelligence<br>Engine <span class="hero-highlight">> V10_</span></span>
 </div>
-""", unsafe_allow_html=True)
+"""
+_STAGE_TAGS_HTML: Final = """
+<span class="ui-tag">01/ CLASSIFY</span>
+<span class="ui-tag">02/ GRAPH</span>
+<span class="ui-tag">03/ ANALYZE</span>
+"""
+_SIDEBAR_TAGS_HTML: Final = f'<div style="margin-top: 20px;">{_STAGE_TAGS_HTML}</div>'
+_LANDING_HTML: Final = f"""
+<div class="ui-card" style="text-align: center; padding: 60px;">
+<h3 style="margin-bottom: 20px;">READY FOR ANALYSIS</h3>
+<p style="color: #6B7280; margin-bottom: 30px;">Upload a contract to begin V10 analysis.</p>
+<div>{_STAGE_TAGS_HTML}</div>
+</div>
+"""
+# --- Hero Section ---
+st.markdown(_HERO_HTML, unsafe_allow_html=True)
 # --- Sidebar ---
 with st.sidebar:
 st.markdown("### CONFIGURATION")
@@ -107,22 +237,15 @@ contract_type = st.selectbox("CONTRACT TYPE", [
 ])
 st.divider()
 uploaded_file = st.file_uploader("UPLOAD CONTRACT", type=["pdf"])
-st.markdown("""
-<div style="margin-top: 20px;">
-<span class="ui-tag">01/ CLASSIFY</span>
-<span class="ui-tag">02/ GRAPH</span>
-<span class="ui-tag">03/ ANALYZE</span>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_SIDEBAR_TAGS_HTML, unsafe_allow_html=True)
 # --- Main Dashboard ---
+STREAM_STAGES = ("SYSTEM", "01 / CLASSIFIER", "02 / GRAPH", "03 / POWER", "04 / DISPUTES", "VERDICT")
 if uploaded_file:
 if "analysis_complete" not in st.session_state:
 st.session_state.analysis_complete = False
 st.session_state.report = {}
+st.session_state.view = None
 st.session_state.v10_report = None
-with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-tmp_file.write(uploaded_file.getvalue())
-tmp_path = tmp_file.name
 col_dash, col_log = st.columns([2, 1])
 with col_dash:
 st.markdown('<div class="section-header">/// CONTRACT ANALYSIS</div>', unsafe_allow_html=True)
@@ -131,63 +254,75 @@ st.session_state.analyzing = True
 stream_container = st.empty()
 dash_tabs = st.empty()
 if st.session_state.get("analyzing"):
-stream_html = '<div class="ui-card">'
-stream_html += '<div class="stream-item"><div class="stream-agent">SYSTEM</div><div class="stream-content">Ingesting document...</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
-# Step 1: Extract text
-processor = PDFProcessor()
-text = processor.extract_layout_aware_text(tmp_path)
-stream_html += '<div class="stream-item"><div class="stream-agent">01 / CLASSIFIER</div><div class="stream-content">Embedding-based clause classification...</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
-# Step 2: Run V10 pipeline
-pipeline = V10Pipeline(multilingual=True)
-report = pipeline.analyze(text, contract_type)
-stream_html += f'<div class="stream-item"><div class="stream-agent">02 / GRAPH</div><div class="stream-content">Clause relationships mapped: {report.graph["conflict_count"]} conflicts, {report.graph["dependency_gap_count"]} gaps</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
-stream_html += f'<div class="stream-item"><div class="stream-agent">03 / POWER</div><div class="stream-content">Asymmetry score: {report.power["power_score"]:.0f}/100</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
-stream_html += f'<div class="stream-item"><div class="stream-agent">04 / DISPUTES</div><div class="stream-content">{len(report.disputes["hotspots"])} hotspots identified</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
-stream_html += f'<div class="stream-item"><div class="stream-agent">VERDICT</div><div class="stream-content">Risk Level: {report.risk_level} ({report.overall_risk_score:.0f}/100) | {report.analysis_time_ms}ms</div></div>'
-stream_container.markdown(stream_html + "</div>", unsafe_allow_html=True)
+log = stream_container.container()
+# One slot per stage: each update writes only its own row
+slots = {agent: log.empty() for agent in STREAM_STAGES}
+rows = {}
+def stream_row(agent, content):
+rows[agent] = f'<div class="stream-item"><div class="stream-agent">{agent}</div><div class="stream-content">{content}</div></div>'
+slots[agent].markdown(rows[agent], unsafe_allow_html=True)
+stream_row("SYSTEM", "Ingesting document...")
+# Step 1: Extract text while the pipeline models load in the background
+warmup = threading.Thread(target=get_pipeline, daemon=True)
+add_script_run_ctx(warmup)
+warmup.start()
+file_hash = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+text = extract_contract_text(file_hash, uploaded_file)
+stream_row("01 / CLASSIFIER", "Embedding-based clause classification...")
+# Step 2: Run V10 pipeline, updating each stage's row as soon as it finishes
+def on_stage(stage, result):
+if stage == "classify":
+stream_row("01 / CLASSIFIER", f"{len(result)} clauses classified")
+stream_row("02 / GRAPH", "Mapping clause relationships...")
+elif stage == "graph":
+stream_row("02 / GRAPH", f"Clause relationships mapped: {result.conflict_count} conflicts, {result.dependency_gap_count} gaps")
+stream_row("03 / POWER", "Scoring party asymmetry...")
+elif stage == "power":
+stream_row("03 / POWER", f"Asymmetry score: {result.power_score:.0f}/100")
+stream_row("04 / DISPUTES", "Predicting dispute hotspots...")
+elif stage == "disputes":
+stream_row("04 / DISPUTES", f"{len(result.hotspots)} hotspots identified")
+warmup.join()
+pipeline = get_pipeline()
+report = pipeline.analyze(text, contract_type, on_stage=on_stage)
+stream_row("VERDICT", f"Risk Level: {report.risk_level} ({report.overall_risk_score:.0f}/100) | {report.analysis_time_ms}ms")
+# Finalize: collapse the rows into a single card, joined once
+stream_container.markdown('<div class="ui-card">' + "".join(rows[a] for a in STREAM_STAGES if a in rows) + "</div>", unsafe_allow_html=True)
 st.session_state.v10_report = report
 st.session_state.report = report.to_dict()
+st.session_state.view = ReportView.from_report(st.session_state.report)
 st.session_state.analysis_complete = True
 st.session_state.analyzing = False
-os.remove(tmp_path)
 # Render visuals after analysis
 if st.session_state.analysis_complete and st.session_state.report:
-data = st.session_state.report
+view = st.session_state.view
+charts = report_charts(view)
 with dash_tabs:
 st.markdown('<div class="section-header" style="margin-top: 20px;">/// ANALYSIS RESULTS</div>', unsafe_allow_html=True)
 tab_graph, tab_power, tab_disputes, tab_raw = st.tabs([
 "GRAPH", "POWER", "DISPUTES", "RAW JSON",
 ])
 with tab_graph:
-graph = data.get("graph_analysis", {})
-st.plotly_chart(create_completeness_chart(graph), use_container_width=True)
-if graph.get("conflicts"):
+render_figure(charts["completeness"], height=200)
+if view.conflicts:
 st.markdown("**Conflicts Detected:**")
-for c in graph["conflicts"]:
+for c in view.conflicts:
 st.warning(f"{c['clause_a']} vs {c['clause_b']}: {c['description']}")
-if graph.get("missing_dependencies"):
+if view.missing_dependencies:
 st.markdown("**Missing Dependencies:**")
-for d in graph["missing_dependencies"]:
+for d in view.missing_dependencies:
 st.error(f"{d['clause_has']} requires {d['clause_needs']}: {d['description']}")
-if graph.get("missing_expected"):
+if view.missing_expected:
 st.markdown("**Missing Expected Clauses:**")
-for m in graph["missing_expected"][:5]:
+for m in view.missing_expected:
 st.info(f"{m['clause_type'].replace('_', ' ').title()} -- expected in {int(m['expected_prevalence'] * 100)}% of similar contracts")
 with tab_power:
-power = data.get("power_analysis", {})
-power_fig = create_power_bar(power)
-if power_fig:
-st.plotly_chart(power_fig, use_container_width=True)
-st.markdown(f"**{power.get('summary', '')}**")
+if charts["power"]:
+render_figure(charts["power"], height=280)
+st.markdown(f"**{view.power_summary}**")
 with tab_disputes:
-disputes = data.get("dispute_prediction", {})
-st.markdown(f"**Predicted Dispute Volume:** {disputes.get('dispute_count_prediction', 'N/A')}")
-for h in disputes.get("hotspots", [])[:8]:
+st.markdown(f"**Predicted Dispute Volume:** {view.dispute_count_prediction}")
+for h in view.hotspots:
 severity = h["severity"]
 color = {"CRITICAL": "red", "HIGH": "orange", "MEDIUM": "blue"}.get(severity, "gray")
 st.markdown(
@@ -199,14 +334,14 @@ st.caption(h["reason"])
 st.caption(f"Recommendation: {h['recommendation']}")
 st.divider()
 with tab_raw:
-st.json(data)
+st.json(st.session_state.report)
 # --- Result sidebar ---
 with col_log:
 if st.session_state.analysis_complete and st.session_state.report:
-data = st.session_state.report
-overall = data.get("overall", {})
-risk = overall.get("risk_score", 50)
-risk_level = overall.get("risk_level", "MEDIUM")
+view = st.session_state.view
+charts = report_charts(view)
+risk = view.risk_score
+risk_level = view.risk_level
 st.markdown(f"""
 <div class="verdict-card-black">
 <div class="verdict-title">> Contract Report</div>
@@ -214,29 +349,23 @@ st.markdown(f"""
 <div class="risk-label">CONTRACT RISK SCORE</div>
 <hr style="border-color: #333; margin: 20px 0;">
 <div style="font-family: 'Space Grotesk'; font-size: 1.2rem;">{risk_level} RISK</div>
-<div class="risk-label">COMPLETENESS: {data.get('graph_analysis', {}).get('completeness_score', 0):.0%}</div>
+<div class="risk-label">COMPLETENESS: {view.completeness_score:.0%}</div>
 <div style="margin-top: 30px; text-align: right;">
 <span class="ui-tag">EXPORT JSON</span>
 </div>
 </div>
 """, unsafe_allow_html=True)
 st.markdown('<div class="section-header" style="margin-top: 30px;">/// RISK GAUGE</div>', unsafe_allow_html=True)
-st.plotly_chart(create_risk_gauge(risk, risk_level), use_container_width=True)
+# Informational only, so a cached static image beats loading Plotly.js for it
+if charts["gauge_png"]:
+st.image(charts["gauge_png"])
+else:
+render_figure(charts["gauge"], height=250)
 st.markdown('<div class="section-header" style="margin-top: 20px;">/// SUMMARY</div>', unsafe_allow_html=True)
-st.markdown(overall.get("executive_summary", ""))
+st.markdown(view.executive_summary)
 # Classifications
 st.markdown('<div class="section-header" style="margin-top: 20px;">/// CLASSIFICATIONS</div>', unsafe_allow_html=True)
-for c in data.get("classifications", [])[:10]:
+for c in view.classifications:
 st.caption(f"{c['id']}: **{c['clause_type'].replace('_', ' ').title()}** ({c['confidence']:.0%})")
 else:
-st.markdown("""
-<div class="ui-card" style="text-align: center; padding: 60px;">
-<h3 style="margin-bottom: 20px;">READY FOR ANALYSIS</h3>
-<p style="color: #6B7280; margin-bottom: 30px;">Upload a contract to begin V10 analysis.</p>
-<div>
-<span class="ui-tag">01/ CLASSIFY</span>
-<span class="ui-tag">02/ GRAPH</span>
-<span class="ui-tag">03/ ANALYZE</span>
-</div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_LANDING_HTML, unsafe_allow_html=True)
@@ -0,0 +1,40 @@
+"""
+Numeric kernels for benchmark metric aggregation.
+JIT-compiled with numba when it is installed (pip install -r
+requirements-bench.txt); otherwise vectorized NumPy equivalents are used.
+"""
+import numpy as np
+try:
+from numba import njit
+NUMBA_AVAILABLE = True
+except ImportError:
+NUMBA_AVAILABLE = False
+if NUMBA_AVAILABLE:
+@njit(cache=True, boundscheck=False)
+def confusion_counts(gt_ids, pr_ids, k):
+"""Per-class TP/FP/FN from integer-coded ground-truth and predicted labels."""
+tp = np.zeros(k, dtype=np.int64)
+fp = np.zeros(k, dtype=np.int64)
+fn = np.zeros(k, dtype=np.int64)
+for i in range(gt_ids.shape[0]):
+g = gt_ids[i]
+p = pr_ids[i]
+if g == p:
+tp[g] += 1
+else:
+fp[p] += 1
+fn[g] += 1
+return tp, fp, fn
+else:
+def confusion_counts(gt_ids, pr_ids, k):
+"""Per-class TP/FP/FN from integer-coded ground-truth and predicted labels."""
+correct = gt_ids == pr_ids
+tp = np.bincount(gt_ids[correct], minlength=k)
+fp = np.bincount(pr_ids[~correct], minlength=k)
+fn = np.bincount(gt_ids[~correct], minlength=k)
+return tp, fp, fn
+def warmup():
+"""Trigger JIT compilation outside the timed benchmark run."""
+if NUMBA_AVAILABLE:
+ids = np.zeros(2, dtype=np.int32)
+confusion_counts(ids, ids, 1)
@@ -3,19 +3,38 @@ BALE V8 Benchmark Suite
 Formal evaluation against CUAD and legal contract datasets.
 Designed for academic research and publication.
 """
-import json
+import gc
+import io
+import os
+import functools
 import time
 import random
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
-from collections import defaultdict
-import statistics
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Tuple, Optional, Iterator, Mapping, Sequence, Union
+from dataclasses import dataclass, field
+from enum import IntEnum
+from datetime import datetime, timezone
+import numpy as np
+from benchmarks import _metrics_kernels
 from src.logger import setup_logger
+from src import jsonio
 logger = setup_logger("bale_benchmark")
 # ==================== BENCHMARK CONFIGURATION ====================
-@dataclass
+class RiskLevel(IntEnum):
+"""Risk levels as small ints so risk comparisons are integer compares."""
+LOW = 0
+MEDIUM = 1
+HIGH = 2
+CRITICAL = 3
+@classmethod
+def coerce(cls, value) -> "RiskLevel":
+"""Normalize an analyzer or dataset risk label (e.g. "high") to a RiskLevel."""
+if isinstance(value, cls):
+return value
+return cls[str(value).upper()]
+@dataclass(slots=True)
 class BenchmarkConfig:
 """Configuration for benchmark run."""
 name: str = "BALE_V8_Benchmark"
@@ -23,12 +42,15 @@ version: str = "1.0.0"
 model_version: str = "V8"
 dataset: str = "CUAD"
 num_samples: int = 500
+batch_size: int = 32
+parallel: bool = False # Threads only help analyzers that release the GIL; latency then includes contention
+num_workers: int = os.cpu_count() or 4
 random_seed: int = 42
 timestamp: str = ""
 def __post_init__(self):
 if not self.timestamp:
-self.timestamp = datetime.utcnow().isoformat()
-@dataclass
+self.timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+@dataclass(slots=True)
 class BenchmarkResult:
 """Individual benchmark result."""
 sample_id: str
@@ -39,8 +61,8 @@ predicted_risk: str
 is_type_correct: bool
 is_risk_correct: bool
 confidence: float
-latency_ms: int
-@dataclass
+latency_us: int
+@dataclass(slots=True)
 class BenchmarkMetrics:
 """Aggregate benchmark metrics."""
 total_samples: int = 0
@@ -54,15 +76,76 @@ macro_f1: float = 0.0
 risk_accuracy: float = 0.0
 risk_precision: Dict[str, float] = field(default_factory=dict)
 risk_recall: Dict[str, float] = field(default_factory=dict)
-# Performance metrics
-avg_latency_ms: float = 0.0
-p50_latency_ms: float = 0.0
-p95_latency_ms: float = 0.0
-p99_latency_ms: float = 0.0
+# Performance metrics (microseconds; sub-ms samples must not collapse to 0)
+avg_latency_us: float = 0.0
+p50_latency_us: int = 0
+p95_latency_us: int = 0
+p99_latency_us: int = 0
 # Confidence calibration
 avg_confidence: float = 0.0
 confidence_when_correct: float = 0.0
 confidence_when_wrong: float = 0.0
+# (sample_id, gt_type, predicted_type, gt_risk, predicted_risk, confidence, latency_us)
+ResultRow = Tuple[str, str, str, Union[RiskLevel, str], Union[RiskLevel, str], float, int]
+class BenchmarkResultTable:
+"""
+Column-oriented benchmark results.
+Labels are interned to integer ids and each field is one NumPy column,
+so metrics are computed with vectorized scans. BenchmarkResult objects
+are only materialized on iteration (JSON export).
+"""
+def __init__(self, n: int = 0):
+self.size = n
+self.sample_ids: List[str] = [""] * n
+self.type_labels: Dict[str, int] = {}
+# Raw label -> id of its lowercased form, so each distinct label is normalized once
+self._type_ids: Dict[str, int] = {}
+self.gt_type_id = np.zeros(n, dtype=np.int32)
+self.pred_type_id = np.zeros(n, dtype=np.int32)
+self.gt_risk = np.zeros(n, dtype=np.int8)
+self.pred_risk = np.zeros(n, dtype=np.int8)
+self.confidence = np.zeros(n, dtype=np.float32)
+self.latency_us = np.zeros(n, dtype=np.int64)
+def set(self, i: int, row: ResultRow):
+"""Write one result row into slot i."""
+sample_id, gt_type, pred_type, gt_risk, pred_risk, confidence, latency_us = row
+self.sample_ids[i] = sample_id
+self.gt_type_id[i] = self._type_id(gt_type)
+self.pred_type_id[i] = self._type_id(pred_type)
+self.gt_risk[i] = RiskLevel.coerce(gt_risk)
+self.pred_risk[i] = RiskLevel.coerce(pred_risk)
+self.confidence[i] = confidence
+self.latency_us[i] = latency_us
+def _type_id(self, label: str) -> int:
+type_id = self._type_ids.get(label)
+if type_id is None:
+types = self.type_labels
+type_id = self._type_ids[label] = types.setdefault(label.lower(), len(types))
+return type_id
+@property
+def is_type_correct(self) -> np.ndarray:
+return self.gt_type_id == self.pred_type_id
+@property
+def is_risk_correct(self) -> np.ndarray:
+return self.gt_risk == self.pred_risk
+def __len__(self) -> int:
+return self.size
+def __iter__(self) -> Iterator[BenchmarkResult]:
+types = list(self.type_labels)
+type_ok = self.is_type_correct
+risk_ok = self.is_risk_correct
+for i in range(self.size):
+yield BenchmarkResult(
+sample_id=self.sample_ids[i],
+ground_truth_type=types[self.gt_type_id[i]],
+predicted_type=types[self.pred_type_id[i]],
+ground_truth_risk=RiskLevel(self.gt_risk[i]).name,
+predicted_risk=RiskLevel(self.pred_risk[i]).name,
+is_type_correct=bool(type_ok[i]),
+is_risk_correct=bool(risk_ok[i]),
+confidence=float(self.confidence[i]),
+latency_us=int(self.latency_us[i])
+)
 # ==================== CUAD DATASET MAPPING ====================
 # Map CUAD clause types to BALE ontology
 CUAD_TO_BALE_MAPPING = {
@@ -120,7 +203,7 @@ CUAD_TO_BALE_MAPPING = {
 "Third Party Beneficiary": "general",
 }
 # Risk level assignments based on CUAD implications
-CUAD_RISK_LEVELS = {
+CUAD_RISK_LEVELS: Dict[str, RiskLevel] = {k: RiskLevel[v] for k, v in {
 "Limitation of Liability": "HIGH",
 "Cap On Liability": "HIGH",
 "Uncapped Liability": "HIGH",
@@ -135,16 +218,10 @@ CUAD_RISK_LEVELS = {
 "Arbitration": "LOW",
 "Warranty": "LOW",
 "Assignment": "LOW",
-}
+}.items()}
 # ==================== SYNTHETIC TEST DATA ====================
-def generate_synthetic_cuad_samples(num_samples: int = 500) -> List[Dict]:
-"""
-Generate synthetic test samples based on CUAD categories.
-For actual research, replace with real CUAD data loading.
-"""
-samples = []
 # Sample clauses by category (simplified for benchmark)
-clause_templates = {
+_CLAUSE_TEMPLATES: Dict[str, List[str]] = {
 "Limitation of Liability": [
 "IN NO EVENT SHALL EITHER PARTY'S TOTAL LIABILITY UNDER THIS AGREEMENT EXCEED THE AMOUNTS PAID IN THE PRECEDING TWELVE MONTHS.",
 "Neither party shall be liable for any amounts in excess of the fees paid under this Agreement.",
@@ -196,34 +273,56 @@ clause_templates = {
 "Licensor warrants the Software will perform substantially as described.",
 ],
 }
-random.seed(42)
-categories = list(clause_templates.keys())
+# Every variation is deterministic apart from the upper-case coin, so build
+# them once at import: (original, shall->will, party->Party, UPPER). A single
+# literal str.replace is already one C-level pass, cheaper than a regex sub.
+_TEMPLATE_VARIANTS: Dict[str, Tuple[Tuple[str, str, str, str], ...]] = {
+category: tuple(
+(t, t.replace("shall", "will"), t.replace("party", "Party"), t.upper())
+for t in templates
+)
+for category, templates in _CLAUSE_TEMPLATES.items()
+}
+def generate_synthetic_cuad_samples(num_samples: int = 500, seed: int = 42) -> Tuple[Mapping, ...]:
+"""
+Generate synthetic test samples based on CUAD categories.
+For actual research, replace with real CUAD data loading.
+Output is deterministic per (num_samples, seed) and shared between calls,
+so the samples are returned as read-only mappings.
+"""
+return _generate_cached(num_samples, seed)
+@functools.lru_cache(maxsize=8)
+def _generate_cached(num_samples: int, seed: int) -> Tuple[Mapping, ...]:
+samples = []
+rng = np.random.default_rng(seed)
+categories = list(_TEMPLATE_VARIANTS)
 samples_per_category = num_samples // len(categories)
-sample_id = 0
 for category in categories:
-templates = clause_templates[category]
-for i in range(samples_per_category):
-template = random.choice(templates)
-# Add some variation
-variations = [
-template,
-template.replace("shall", "will"),
-template.replace("party", "Party"),
-template.upper() if random.random() < 0.1 else template,
-]
-text = random.choice(variations)
-samples.append({
-"id": f"cuad_{sample_id:04d}",
-"text": text,
+rows = _TEMPLATE_VARIANTS[category]
+template_idx = rng.integers(0, len(rows), size=samples_per_category)
+variant_idx = rng.integers(0, 4, size=samples_per_category)
+# The upper-case variant only applies 10% of the time, otherwise the original
+variant_idx[(variant_idx == 3) & (rng.random(samples_per_category) >= 0.1)] = 0
+bale_type = CUAD_TO_BALE_MAPPING.get(category, "general")
+risk_level = CUAD_RISK_LEVELS.get(category, RiskLevel.MEDIUM)
+base_id = len(samples)
+samples.extend(
+{
+"id": f"cuad_{base_id + j:04d}",
+"text": rows[t][v],
 "cuad_category": category,
-"bale_type": CUAD_TO_BALE_MAPPING.get(category, "general"),
-"risk_level": CUAD_RISK_LEVELS.get(category, "MEDIUM"),
-})
-sample_id += 1
+"bale_type": bale_type,
+"risk_level": risk_level,
+}
+for j, (t, v) in enumerate(zip(template_idx.tolist(), variant_idx.tolist()))
+)
 # Shuffle
-random.shuffle(samples)
-return samples[:num_samples]
+samples = [samples[i] for i in rng.permutation(len(samples))]
+return tuple(MappingProxyType(s) for s in samples[:num_samples])
 # ==================== BENCHMARK RUNNER ====================
+def _simulated_confidence(seed: int, sample_id: str) -> float:
+"""Fallback confidence drawn from an RNG seeded per sample, so runs reproduce in any thread order."""
+return 0.85 + random.Random(f"{seed}:{sample_id}").random() * 0.1
 class BALEBenchmark:
 """
 BALE V8 Benchmark Runner
@@ -231,8 +330,10 @@ Evaluates classification accuracy, risk detection, and performance.
 """
 def __init__(self, config: BenchmarkConfig = None):
 self.config = config or BenchmarkConfig()
-self.results: List[BenchmarkResult] = []
+self.results = BenchmarkResultTable()
 self.metrics: Optional[BenchmarkMetrics] = None
+# Compile the metric kernels now so run() timings exclude JIT cost
+_metrics_kernels.warmup()
 # Try to load V8 analyzer
 try:
 from src.v8_analyzer import get_v8_analyzer
@@ -241,23 +342,56 @@ logger.info("V8 Analyzer loaded for benchmarking")
 except Exception as e:
 logger.warning(f"Could not load V8 analyzer: {e}")
 self.analyzer = None
-def run(self, samples: List[Dict] = None) -> BenchmarkMetrics:
+if self.analyzer is None:
+# Bind the specialized fallback so the hot path skips the analyzer branch
+self._evaluate_sample = self._make_fallback_evaluator()
+def run(self, samples: Optional[Sequence[Mapping]] = None) -> BenchmarkMetrics:
 """Run the full benchmark suite."""
 logger.info(f"Starting benchmark: {self.config.name}")
 if samples is None:
-samples = generate_synthetic_cuad_samples(self.config.num_samples)
-self.results = []
-for i, sample in enumerate(samples):
-if i % 50 == 0:
-logger.info(f"Progress: {i}/{len(samples)}")
-result = self._evaluate_sample(sample)
-self.results.append(result)
+samples = generate_synthetic_cuad_samples(self.config.num_samples, seed=self.config.random_seed)
+self.results = BenchmarkResultTable(len(samples))
+batch_size = max(1, self.config.batch_size)
+batches = [samples[start:start + batch_size] for start in range(0, len(samples), batch_size)]
+# Keep cyclic GC pauses out of the latency tail: collect and freeze the
+# existing heap up front, then disable collection while measuring
+gc_was_enabled = gc.isenabled()
+gc.collect()
+gc.freeze()
+gc.disable()
+executor = None
+try:
+# Analyzer backends that release the GIL run batches concurrently; map() keeps sample order
+if self.config.parallel and self.config.num_workers > 1:
+executor = ThreadPoolExecutor(max_workers=self.config.num_workers)
+batch_results = executor.map(self._evaluate_batch, batches)
+else:
+batch_results = map(self._evaluate_batch, batches)
+for start, rows in zip(range(0, len(samples), batch_size), batch_results):
+if start % 50 < batch_size:
+logger.info(f"Progress: {start}/{len(samples)}")
+for i, row in enumerate(rows, start):
+self.results.set(i, row)
+finally:
+if executor:
+executor.shutdown()
+gc.unfreeze()
+# Restore the caller's GC state rather than forcing it back on
+if gc_was_enabled:
+gc.enable()
 self.metrics = self._compute_metrics()
 logger.info(f"Benchmark complete. Type Accuracy: {self.metrics.type_accuracy:.2%}")
 return self.metrics
-def _evaluate_sample(self, sample: Dict) -> BenchmarkResult:
+def _evaluate_batch(self, batch: Sequence[Mapping]) -> List[ResultRow]:
+"""
+Evaluate a mini-batch (the unit of work handed to each worker).
+Samples are timed one by one: a batch-averaged latency would flatten
+the p95/p99 tail the report exists to show.
+"""
+return [self._evaluate_sample(sample) for sample in batch]
+def _evaluate_sample(self, sample: Mapping) -> ResultRow:
 """Evaluate a single sample."""
-start_time = time.time()
+start_ns = time.perf_counter_ns()
 if self.analyzer:
 # Use actual V8 analyzer
 try:
@@ -272,94 +406,111 @@ confidence = result.confidence
 except Exception as e:
 logger.warning(f"Analysis failed for {sample['id']}: {e}")
 predicted_type = "unknown"
-predicted_risk = "MEDIUM"
+predicted_risk = RiskLevel.MEDIUM
 confidence = 0.0
 else:
 # Fallback: simulate predictions for testing
 predicted_type = sample["bale_type"] # Perfect prediction for testing
 predicted_risk = sample["risk_level"]
-confidence = 0.85 + random.random() * 0.1
-latency_ms = int((time.time() - start_time) * 1000)
-# Normalize for comparison
-ground_truth_type = sample["bale_type"].lower()
-predicted_type_normalized = predicted_type.lower()
-is_type_correct = ground_truth_type == predicted_type_normalized
-is_risk_correct = sample["risk_level"] == predicted_risk
-return BenchmarkResult(
-sample_id=sample["id"],
-ground_truth_type=ground_truth_type,
-predicted_type=predicted_type_normalized,
-ground_truth_risk=sample["risk_level"],
-predicted_risk=predicted_risk,
-is_type_correct=is_type_correct,
-is_risk_correct=is_risk_correct,
-confidence=confidence,
-latency_ms=latency_ms
+confidence = _simulated_confidence(self.config.random_seed, sample["id"])
+latency_us = (time.perf_counter_ns() - start_ns) // 1000
+return self._build_row(sample, predicted_type, predicted_risk, confidence, latency_us)
+def _make_fallback_evaluator(self) -> Callable[[Mapping], ResultRow]:
+"""
+Build the analyzer-free evaluator: a perfect prediction with simulated
+confidence. Globals are bound as locals and the row is built inline.
+"""
+seed = self.config.random_seed
+simulated_confidence = _simulated_confidence
+clock_ns = time.perf_counter_ns
+def evaluate(sample: Mapping) -> ResultRow:
+start_ns = clock_ns()
+bale_type = sample["bale_type"]
+risk_level = sample["risk_level"]
+confidence = simulated_confidence(seed, sample["id"])
+return (sample["id"], bale_type, bale_type, risk_level, risk_level, confidence, (clock_ns() - start_ns) // 1000)
+return evaluate
+def _build_row(
+self,
+sample: Mapping,
+predicted_type: str,
+predicted_risk: Union[RiskLevel, str],
+confidence: float,
+latency_us: int
+) -> ResultRow:
+# Type labels are lowercased by the result table, once per distinct label
+return (
+sample["id"],
+sample["bale_type"],
+predicted_type,
+sample["risk_level"],
+predicted_risk,
+confidence,
+latency_us
 )
 def _compute_metrics(self) -> BenchmarkMetrics:
 """Compute aggregate metrics from results."""
 metrics = BenchmarkMetrics()
-metrics.total_samples = len(self.results)
-if not self.results:
+table = self.results
+n = len(table)
+metrics.total_samples = n
+if not n:
 return metrics
-# Classification accuracy
-correct_types = sum(1 for r in self.results if r.is_type_correct)
-metrics.type_accuracy = correct_types / len(self.results)
-# Risk accuracy
-correct_risks = sum(1 for r in self.results if r.is_risk_correct)
-metrics.risk_accuracy = correct_risks / len(self.results)
+# Labels are already interned, so every metric is a vectorized pass over the columns
+gt = table.gt_type_id
+pr = table.pred_type_id
+correct = table.is_type_correct
+# Classification / risk accuracy
+metrics.type_accuracy = float(correct.mean())
+metrics.risk_accuracy = float(table.is_risk_correct.mean())
 # Per-class precision/recall
-type_true_positives = defaultdict(int)
-type_false_positives = defaultdict(int)
-type_false_negatives = defaultdict(int)
-for r in self.results:
-if r.is_type_correct:
-type_true_positives[r.ground_truth_type] += 1
-else:
-type_false_positives[r.predicted_type] += 1
-type_false_negatives[r.ground_truth_type] += 1
-all_types = set(r.ground_truth_type for r in self.results)
-f1_scores = []
-for t in all_types:
-tp = type_true_positives[t]
-fp = type_false_positives[t]
-fn = type_false_negatives[t]
-precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0
-metrics.type_precision[t] = precision
-metrics.type_recall[t] = recall
-metrics.type_f1[t] = f1
-f1_scores.append(f1)
-metrics.macro_f1 = statistics.mean(f1_scores) if f1_scores else 0
+k = len(table.type_labels)
+tp, fp, fn = _metrics_kernels.confusion_counts(gt, pr, k)
+precision = np.divide(tp, tp + fp, out=np.zeros(k), where=(tp + fp) > 0)
+recall = np.divide(tp, tp + fn, out=np.zeros(k), where=(tp + fn) > 0)
+pr_sum = precision + recall
+f1 = np.divide(2 * precision * recall, pr_sum, out=np.zeros(k), where=pr_sum > 0)
+# Metrics are reported for ground-truth classes only
+labels = list(table.type_labels)
+gt_ids = np.unique(gt)
+for i in gt_ids:
+t = labels[i]
+metrics.type_precision[t] = float(precision[i])
+metrics.type_recall[t] = float(recall[i])
+metrics.type_f1[t] = float(f1[i])
+metrics.macro_f1 = float(f1[gt_ids].mean())
 # Latency metrics
-latencies = [r.latency_ms for r in self.results]
-metrics.avg_latency_ms = statistics.mean(latencies)
-sorted_latencies = sorted(latencies)
-metrics.p50_latency_ms = sorted_latencies[len(sorted_latencies) // 2]
-metrics.p95_latency_ms = sorted_latencies[int(len(sorted_latencies) * 0.95)]
-metrics.p99_latency_ms = sorted_latencies[int(len(sorted_latencies) * 0.99)]
+# Only three order statistics are needed, so select them in O(n) instead of sorting
+latencies = table.latency_us
+metrics.avg_latency_us = float(latencies.mean())
+idxs = [n // 2, int(n * 0.95), int(n * 0.99)]
+p50, p95, p99 = np.partition(latencies, idxs)[idxs]
+metrics.p50_latency_us = int(p50)
+metrics.p95_latency_us = int(p95)
+metrics.p99_latency_us = int(p99)
 # Confidence calibration
-confidences = [r.confidence for r in self.results]
-metrics.avg_confidence = statistics.mean(confidences)
-correct_confidences = [r.confidence for r in self.results if r.is_type_correct]
-wrong_confidences = [r.confidence for r in self.results if not r.is_type_correct]
-metrics.confidence_when_correct = statistics.mean(correct_confidences) if correct_confidences else 0
-metrics.confidence_when_wrong = statistics.mean(wrong_confidences) if wrong_confidences else 0
+confidences = table.confidence.astype(np.float64)
+metrics.avg_confidence = float(confidences.mean())
+metrics.confidence_when_correct = float(confidences[correct].mean()) if correct.any() else 0
+metrics.confidence_when_wrong = float(confidences[~correct].mean()) if not correct.all() else 0
 return metrics
 def save_results(self, output_dir: str = "benchmarks") -> Tuple[Path, Path]:
 """Save benchmark results and metrics to files."""
 output_path = Path(output_dir)
 output_path.mkdir(parents=True, exist_ok=True)
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+# Derive the file suffix from the config timestamp so the filenames, JSON and report agree
+try:
+run_time = datetime.fromisoformat(self.config.timestamp)
+except ValueError:
+run_time = datetime.now(timezone.utc)
+timestamp = run_time.strftime("%Y%m%d_%H%M%S")
 # Save detailed results
 results_file = output_path / f"benchmark_results_{timestamp}.json"
-with open(results_file, 'w') as f:
-json.dump({
-"config": asdict(self.config),
-"results": [asdict(r) for r in self.results],
-"metrics": asdict(self.metrics) if self.metrics else None
-}, f, indent=2)
+results_file.write_bytes(jsonio.dumps({
+"config": self.config,
+"results": list(self.results),
+"metrics": self.metrics
+}, default=str, indent=True))
 # Save summary report (Markdown for GitHub)
 report_file = output_path / f"BENCHMARK_REPORT_{timestamp}.md"
 report = self._generate_markdown_report()
@@ -370,7 +521,8 @@ return results_file, report_file
 def _generate_markdown_report(self) -> str:
 """Generate a Markdown benchmark report for publication."""
 m = self.metrics
-report = f"""# BALE V8 Benchmark Report
+buf = io.StringIO()
+buf.write(f"""# BALE V8 Benchmark Report
 > **Generated**: {self.config.timestamp}
 > **Model Version**: {self.config.model_version}
 > **Dataset**: {self.config.dataset}
@@ -381,7 +533,7 @@ report = f"""# BALE V8 Benchmark Report
 | **Classification Accuracy** | {m.type_accuracy:.2%} |
 | **Risk Detection Accuracy** | {m.risk_accuracy:.2%} |
 | **Macro F1** | {m.macro_f1:.3f} |
-| **Avg Latency** | {m.avg_latency_ms:.0f}ms |
+| **Avg Latency** | {m.avg_latency_us / 1000:.2f}ms |
 ## Classification Performance
 ### Overall Accuracy
 - **Type Classification**: {m.type_accuracy:.2%}
@@ -389,20 +541,20 @@ report = f"""# BALE V8 Benchmark Report
 ### Per-Class F1 Scores
 | Clause Type | Precision | Recall | F1 |
 |:------------|----------:|-------:|---:|
-"""
+""")
 for clause_type in sorted(m.type_f1.keys()):
 p = m.type_precision.get(clause_type, 0)
 r = m.type_recall.get(clause_type, 0)
 f1 = m.type_f1.get(clause_type, 0)
-report += f"| {clause_type} | {p:.2%} | {r:.2%} | {f1:.3f} |\n"
-report += f"""
+buf.write(f"| {clause_type} | {p:.2%} | {r:.2%} | {f1:.3f} |\n")
+buf.write(f"""
 ## Latency Performance
 | Percentile | Latency |
 |:-----------|--------:|
-| Average | {m.avg_latency_ms:.0f}ms |
-| P50 | {m.p50_latency_ms:.0f}ms |
-| P95 | {m.p95_latency_ms:.0f}ms |
-| P99 | {m.p99_latency_ms:.0f}ms |
+| Average | {m.avg_latency_us / 1000:.2f}ms |
+| P50 | {m.p50_latency_us / 1000:.2f}ms |
+| P95 | {m.p95_latency_us / 1000:.2f}ms |
+| P99 | {m.p99_latency_us / 1000:.2f}ms |
 ## Confidence Calibration
 | Condition | Avg Confidence |
 |:----------|---------------:|
@@ -416,14 +568,15 @@ This benchmark uses synthetic samples based on the CUAD (Contract Understanding
 - **Accuracy**: Exact match between predicted and ground truth labels
 - **F1 Score**: Harmonic mean of precision and recall
 - **Macro F1**: Unweighted average of per-class F1 scores
+- **Latency**: Measured with Python's cyclic garbage collector frozen and disabled, so GC pauses do not distort tail percentiles
 ### Reproducibility
 - Random Seed: {self.config.random_seed}
 - Model Version: {self.config.model_version}
 - Timestamp: {self.config.timestamp}
 ---
 *Report generated by BALE Benchmark Suite v{self.config.version}*
-"""
-return report
+""")
+return buf.getvalue()
 def run_benchmark(num_samples: int = 500) -> Tuple[BenchmarkMetrics, Path]:
 """Convenience function to run benchmark and save results."""
 config = BenchmarkConfig(num_samples=num_samples)
@@ -4,8 +4,9 @@ Connection management and session handling.
 """
 import os
 from contextlib import contextmanager
+from datetime import date
 from typing import Generator
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
@@ -36,10 +37,11 @@ DATABASE_URL = get_database_url()
 engine = create_engine(
 DATABASE_URL,
 poolclass=QueuePool,
-pool_size=5,
+pool_size=20,
 max_overflow=10,
 pool_timeout=30,
 pool_recycle=1800, # Recycle connections after 30 min
+pool_pre_ping=True, # Detect stale connections on checkout
 echo=os.getenv("BALE_DB_ECHO", "false").lower() == "true"
 )
 # Connection event for setting search_path (multi-tenant future)
@@ -85,13 +87,87 @@ db.rollback()
 raise
 finally:
 db.close()
+@contextmanager
+def bulk_session() -> Generator[Session, None, None]:
+"""
+Context manager for bulk writes committed in a single transaction.
+Pair with SQLAlchemy 2.0 executemany-style inserts:
+with bulk_session() as db:
+db.execute(insert(Model), [asdict(r) for r in rows])
+"""
+# Nothing reads the written objects back, so skip expiring them on commit
+db = SessionLocal(expire_on_commit=False)
+db.autoflush = False
+try:
+yield db
+db.commit()
+except Exception:
+db.rollback()
+raise
+finally:
+db.close()
 # ==================== INITIALIZATION ====================
 def init_db():
 """
 Initialize database tables.
 For production, use Alembic migrations instead.
+create_all makes analyses and audit_logs partitioned parents with no
+partitions, which reject every insert; the current months and a DEFAULT
+are created right away. Keep create_monthly_partitions() (make
+partitions) on a schedule so later months exist before rows arrive.
 """
 Base.metadata.create_all(bind=engine)
+create_monthly_partitions()
+# Tables declared PARTITION BY RANGE (created_at) in database.models
+PARTITIONED_TABLES = ("analyses", "audit_logs")
+def _next_month(day: date) -> date:
+"""First day of the month after day."""
+year, month = divmod(day.month, 12)
+return date(day.year + year, month + 1, 1)
+def _relation_exists(conn, name: str) -> bool:
+return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+def create_monthly_partitions(months_ahead: int = 3) -> None:
+"""
+Ensure monthly partitions exist from the current month through
+months_ahead, then a DEFAULT partition for rows outside them.
+Not called at startup: run it ahead of time on a schedule (e.g. a daily
+cron via `make partitions`) so upcoming months exist before rows arrive;
+old months can then be dropped with DROP TABLE instead of DELETE + VACUUM.
+Postgres refuses to add a range while the DEFAULT partition holds rows in
+it, so in that case the DEFAULT is detached, the month created, its rows
+moved across, and the DEFAULT re-attached, all in one transaction.
+"""
+start = date.today().replace(day=1)
+months = []
+for _ in range(months_ahead + 1):
+months.append(start)
+start = _next_month(start)
+with engine.begin() as conn:
+for table in PARTITIONED_TABLES:
+default = f"{table}_default"
+has_default = _relation_exists(conn, default)
+for start in months:
+name = f"{table}_{start:%Y_%m}"
+if _relation_exists(conn, name):
+continue
+bounds = {"start": start, "end": _next_month(start)}
+in_range = "created_at >= :start AND created_at < :end"
+stranded = has_default and conn.execute(
+text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), bounds
+).scalar()
+if stranded:
+conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+conn.execute(text(
+f"CREATE TABLE {name} PARTITION OF {table} "
+f"FOR VALUES FROM ('{start.isoformat()}') TO ('{bounds['end'].isoformat()}')"
+))
+if stranded:
+conn.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}"), bounds)
+conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+# Created last so it never pre-empts a month created above
+if not has_default:
+conn.execute(text(f"CREATE TABLE {default} PARTITION OF {table} DEFAULT"))
 def drop_db():
 """
 Drop all tables. USE WITH CAUTION.
@@ -99,10 +175,9 @@ Drop all tables. USE WITH CAUTION.
 Base.metadata.drop_all(bind=engine)
 # ==================== HEALTH CHECK ====================
 def check_db_connection() -> bool:
-"""Check if database is reachable."""
+"""Check if database is reachable (SELECT 1 on a pooled connection)."""
 try:
 with engine.connect() as conn:
-conn.execute("SELECT 1")
-return True
+return conn.execute(text("SELECT 1")).scalar() == 1
 except Exception:
 return False
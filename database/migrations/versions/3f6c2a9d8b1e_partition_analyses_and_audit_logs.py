@@ -0,0 +1,100 @@
+"""Partition analyses and audit_logs by month on created_at
+
+Converts the existing plain tables in place: each is renamed aside, a
+RANGE (created_at) parent is created with the (id, created_at) primary key,
+monthly partitions are created from the oldest row through three months
+ahead plus a DEFAULT, and the rows are copied across in one transaction.
+Tables that are missing or already partitioned (fresh create_all) are
+left alone.
+
+Revision ID: 3f6c2a9d8b1e
+Revises:
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision: str = "3f6c2a9d8b1e"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+MONTHS_AHEAD = 3
+# table -> (foreign keys, indexes) as declared in database.models at this revision
+TABLES = {
+"analyses": (
+[("user_id", "users"), ("contract_id", "contracts")],
+[
+("ix_analyses_user_created", ["user_id", "created_at"], {"postgresql_include": ["risk_score", "processing_time_ms", "verdict"]}),
+("ix_analyses_contract", ["contract_id"], {}),
+],
+),
+"audit_logs": (
+[("user_id", "users"), ("api_key_id", "api_keys")],
+[
+("ix_audit_user_action", ["user_id", "action"], {}),
+("ix_audit_created", ["created_at"], {}),
+],
+),
+}
+def _relkind(table: str):
+"""'r' for a plain table, 'p' for a partitioned one, None if missing."""
+return op.get_bind().execute(
+sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": table}
+).scalar()
+def _next_month(day: date) -> date:
+year, month = divmod(day.month, 12)
+return date(day.year + year, month + 1, 1)
+def _swap_out(table: str, old: str) -> None:
+"""Rename table to old, freeing its schema-wide index names for the replacement."""
+op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+for name, _, _ in TABLES[table][1]:
+op.execute(f"DROP INDEX IF EXISTS {name}")
+def _add_keys_and_indexes(table: str) -> None:
+foreign_keys, indexes = TABLES[table]
+for column, target in foreign_keys:
+op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {target} (id)")
+for name, columns, kwargs in indexes:
+op.create_index(name, table, columns, **kwargs)
+def upgrade() -> None:
+conn = op.get_bind()
+for table in TABLES:
+if _relkind(table) != "r":
+continue
+legacy = f"{table}_legacy"
+_swap_out(table, legacy)
+op.execute(f"UPDATE {legacy} SET created_at = now() WHERE created_at IS NULL")
+op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+_add_keys_and_indexes(table)
+# One partition per month holding data, through MONTHS_AHEAD months from now
+oldest = conn.execute(sa.text(f"SELECT min(created_at) FROM {legacy}")).scalar()
+start = min(oldest.date() if oldest else date.today(), date.today()).replace(day=1)
+last = date.today().replace(day=1)
+for _ in range(MONTHS_AHEAD):
+last = _next_month(last)
+while start <= last:
+end = _next_month(start)
+op.execute(
+f"CREATE TABLE {table}_{start:%Y_%m} PARTITION OF {table} "
+f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+)
+start = end
+op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+op.execute(f"DROP TABLE {legacy}")
+def downgrade() -> None:
+for table in TABLES:
+if _relkind(table) != "p":
+continue
+partitioned = f"{table}_partitioned"
+_swap_out(table, partitioned)
+op.execute(f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS)")
+op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+_add_keys_and_indexes(table)
+op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+# Drops the month and DEFAULT partitions with it
+op.execute(f"DROP TABLE {partitioned}")
@@ -0,0 +1,41 @@
+"""Add generated tsvector columns and GIN indexes for full-text search
+
+Adds contracts.content_tsv and clauses.text_tsv as STORED generated columns
+(computed by PostgreSQL from content_text / text) and builds their GIN
+indexes CONCURRENTLY. Adding a stored generated column rewrites the table
+under an exclusive lock, so run this in a maintenance window on large
+databases. Idempotent against databases created by create_all.
+
+Revision ID: 7b2e4c1a9f30
+Revises: 3f6c2a9d8b1e
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+# revision identifiers, used by Alembic.
+revision: str = "7b2e4c1a9f30"
+down_revision: Union[str, None] = "3f6c2a9d8b1e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# (table, column, source column, index) as declared in database.models
+COLUMNS = [
+("contracts", "content_tsv", "content_text", "ix_contracts_content_tsv"),
+("clauses", "text_tsv", "text", "ix_clauses_text_tsv"),
+]
+def upgrade() -> None:
+for table, column, source, _ in COLUMNS:
+op.execute(
+f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector "
+f"GENERATED ALWAYS AS (to_tsvector('english', coalesce({source}, ''))) STORED"
+)
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+with op.get_context().autocommit_block():
+for table, column, _, index in COLUMNS:
+op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} USING gin ({column})")
+def downgrade() -> None:
+with op.get_context().autocommit_block():
+for _, _, _, index in COLUMNS:
+op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+for table, column, _, _ in COLUMNS:
+op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,41 @@
+"""Add the pending-training partial index and jsonb_path_ops GIN indexes
+
+ix_training_pending covers only examples still eligible for training;
+ix_contracts_tags_gin / ix_contracts_parties_gin serve JSONB @> lookups.
+All three are built CONCURRENTLY, and skipped where create_all already
+made them.
+
+Revision ID: c41d8e7a2b56
+Revises: 7b2e4c1a9f30
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+# revision identifiers, used by Alembic.
+revision: str = "c41d8e7a2b56"
+down_revision: Union[str, None] = "7b2e4c1a9f30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# (name, table, columns, kwargs) as declared in database.models
+INDEXES = [
+("ix_training_pending", "training_examples", ["task_type"], {
+"postgresql_where": sa.text("is_validated AND NOT is_used_in_training"),
+}),
+("ix_contracts_tags_gin", "contracts", ["tags"], {
+"postgresql_using": "gin", "postgresql_ops": {"tags": "jsonb_path_ops"},
+}),
+("ix_contracts_parties_gin", "contracts", ["parties"], {
+"postgresql_using": "gin", "postgresql_ops": {"parties": "jsonb_path_ops"},
+}),
+]
+def upgrade() -> None:
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+with op.get_context().autocommit_block():
+for name, table, columns, kwargs in INDEXES:
+op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+def downgrade() -> None:
+with op.get_context().autocommit_block():
+for name, table, _, _ in INDEXES:
+op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
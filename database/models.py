@@ -2,20 +2,29 @@
 BALE Database Models
 SQLAlchemy models for PostgreSQL persistence.
 """
-import uuid
+import os
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy import (
 Column, String, Integer, Float, Boolean, DateTime, Text, JSON,
-ForeignKey, Enum as SQLEnum, Index, UniqueConstraint
+ForeignKey, Enum as SQLEnum, Index, UniqueConstraint, Computed, text
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from sqlalchemy.sql import func
 Base = declarative_base()
 # ==================== UTILITY ====================
 def generate_uuid():
-return str(uuid.uuid4())
+"""
+Random (version 4) UUID in canonical hyphenated form.
+Formats os.urandom bytes directly instead of building a uuid.UUID per row;
+the canonical form matches what PostgreSQL returns for as_uuid=False columns.
+"""
+raw = bytearray(os.urandom(16))
+raw[6] = raw[6] & 0x0F | 0x40 # version 4
+raw[8] = raw[8] & 0x3F | 0x80 # RFC 4122 variant
+h = raw.hex()
+return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
 # ==================== USER & AUTH ====================
 class User(Base):
 """User account for multi-tenant support."""
@@ -77,6 +86,8 @@ name = Column(String(256), nullable=False)
 description = Column(Text)
 # Content
 content_text = Column(Text) # Extracted text
+# Deferred: only searched, never read, so entity loads and RETURNING skip it
+content_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('english', coalesce(content_text, ''))", persisted=True)))
 content_hash = Column(String(64)) # SHA-256 of original file
 original_filename = Column(String(256))
 file_type = Column(String(32)) # pdf, docx, txt
@@ -107,6 +118,10 @@ clauses = relationship("Clause", back_populates="contract")
 __table_args__ = (
 Index("ix_contracts_owner_status", "owner_id", "status"),
 Index("ix_contracts_jurisdiction", "jurisdiction"),
+Index("ix_contracts_content_tsv", "content_tsv", postgresql_using="gin"),
+# jsonb_path_ops: smaller GIN indexes that serve @> containment lookups
+Index("ix_contracts_tags_gin", "tags", postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}),
+Index("ix_contracts_parties_gin", "parties", postgresql_using="gin", postgresql_ops={"parties": "jsonb_path_ops"}),
 )
 class Clause(Base):
 """Individual clause extracted from a contract."""
@@ -117,6 +132,7 @@ contract_id = Column(UUID(as_uuid=False), ForeignKey("contracts.id"), nullable=F
 clause_number = Column(String(32)) # "5.2", "Article 12"
 title = Column(String(256))
 text = Column(Text, nullable=False)
+text_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('english', coalesce(text, ''))", persisted=True)))
 # Classification
 clause_type = Column(String(64)) # liability, termination, ip, force_majeure, etc.
 # Analysis Cache
@@ -126,6 +142,9 @@ last_analyzed_at = Column(DateTime(timezone=True))
 created_at = Column(DateTime(timezone=True), server_default=func.now())
 # Relationships
 contract = relationship("Contract", back_populates="clauses")
+__table_args__ = (
+Index("ix_clauses_text_tsv", "text_tsv", postgresql_using="gin"),
+)
 # ==================== ANALYSIS ====================
 class Analysis(Base):
 """Record of a BALE analysis run."""
@@ -161,14 +180,20 @@ full_report = Column(JSONB)
 # Performance
 processing_time_ms = Column(Integer)
 token_count = Column(Integer)
-# Timestamps
-created_at = Column(DateTime(timezone=True), server_default=func.now())
+# Timestamps (partition key, so it must be part of the primary key)
+created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 # Relationships
 user = relationship("User", back_populates="analyses")
 contract = relationship("Contract", back_populates="analyses")
 __table_args__ = (
-Index("ix_analyses_user_created", "user_id", "created_at"),
+# Covers AnalysisRepository.get_stats so it can be answered by an index-only scan
+Index(
+"ix_analyses_user_created", "user_id", "created_at",
+postgresql_include=["risk_score", "processing_time_ms", "verdict"]
+),
 Index("ix_analyses_contract", "contract_id"),
+# Monthly range partitions (migration 3f6c2a9d8b1e); upcoming months via database.config.create_monthly_partitions
+{"postgresql_partition_by": "RANGE (created_at)"},
 )
 # ==================== AUDIT LOG ====================
 class AuditLog(Base):
@@ -188,11 +213,12 @@ resource_id = Column(UUID(as_uuid=False))
 request_data = Column(JSONB) # Sanitized request body
 response_status = Column(Integer)
 error_message = Column(Text)
-# Timestamp
-created_at = Column(DateTime(timezone=True), server_default=func.now())
+# Timestamp (partition key, so it must be part of the primary key)
+created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 __table_args__ = (
 Index("ix_audit_user_action", "user_id", "action"),
 Index("ix_audit_created", "created_at"),
+{"postgresql_partition_by": "RANGE (created_at)"},
 )
 # ==================== TRAINING DATA ====================
 class TrainingExample(Base):
@@ -221,4 +247,9 @@ created_at = Column(DateTime(timezone=True), server_default=func.now())
 validated_at = Column(DateTime(timezone=True))
 __table_args__ = (
 Index("ix_training_task_validated", "task_type", "is_validated"),
+# Only rows still eligible for get_for_training / iter_for_training
+Index(
+"ix_training_pending", "task_type",
+postgresql_where=text("is_validated AND NOT is_used_in_training")
+),
 )
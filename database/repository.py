@@ -2,54 +2,249 @@
 BALE Database Repository
 Data access layer with repository pattern for clean separation.
 """
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Iterable
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
+from cachetools import TTLCache
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from sqlalchemy import event, inspect, desc, and_, or_, any_, case, cast, func, insert, lambda_stmt, select, text, tuple_
 from database.models import (
-User, Contract, Clause, Analysis, AuditLog, APIKey, TrainingExample
+User, Contract, Clause, Analysis, AuditLog, APIKey, TrainingExample, generate_uuid
 )
-# ==================== USER REPOSITORY ====================
-class UserRepository:
+# Keyset pagination position: (created_at, id) of the last row on the previous page
+PageCursor = Tuple[datetime, str]
+def _next_cursor(rows: List[Any], limit: int) -> Optional[PageCursor]:
+return (rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
+# ==================== UNIT OF WORK ====================
+_UNIT_OF_WORK = "bale_unit_of_work" # db.info key holding the nesting depth
+@contextmanager
+def unit_of_work(db: Session):
+"""
+Group several repository writes into one transaction and one commit.
+Scopes nest: only the outermost one commits (or rolls back everything);
+an inner scope runs in a SAVEPOINT, so a failure it raises undoes just
+its own writes if the caller catches it.
+Usage:
+with unit_of_work(db):
+contract = ContractRepository(db).create(...)
+AnalysisRepository(db).create(..., contract_id=contract.id)
+"""
+depth = db.info.get(_UNIT_OF_WORK, 0)
+db.info[_UNIT_OF_WORK] = depth + 1
+try:
+if depth:
+with db.begin_nested():
+yield db
+return
+try:
+yield db
+db.commit()
+except Exception:
+db.rollback()
+raise
+finally:
+if depth:
+db.info[_UNIT_OF_WORK] = depth
+else:
+db.info.pop(_UNIT_OF_WORK, None)
+class BaseRepository:
 def __init__(self, db: Session):
 self.db = db
+@property
+def in_unit_of_work(self) -> bool:
+return self.db.info.get(_UNIT_OF_WORK, 0) > 0
+def _commit(self, *fresh: Any) -> None:
+"""
+Commit standalone writes; inside unit_of_work() the caller commits once.
+Objects in fresh were just loaded by INSERT ... RETURNING, so they stay
+loaded through the commit; everything else is expired as usual.
+"""
+if self.in_unit_of_work:
+return
+db = self.db
+if not fresh or not db.expire_on_commit:
+db.commit()
+return
+db.expire_on_commit = False
+try:
+db.commit()
+finally:
+db.expire_on_commit = True
+keep = {id(obj) for obj in fresh}
+for obj in list(db.identity_map.values()):
+if id(obj) not in keep:
+db.expire(obj)
+# ==================== USER REPOSITORY ====================
+# Process-wide cache of user rows for the per-request auth lookups. Column
+# snapshots are cached (not instances) so each session gets its own object.
+_USER_COLUMNS = tuple(c.key for c in User.__table__.columns)
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60) # ("id"|"email", value) -> snapshot
+_user_cache_lock = threading.Lock()
+# db.info key: cache keys to evict again once the session commits
+_EVICT_USERS = "bale_evict_users"
+def _evict_users(session: Session, user_id: str, *emails: Optional[str]) -> None:
+"""
+Drop a user's id and email entries now and again after the session
+commits, so a lookup in between cannot re-cache the pre-commit row.
+"""
+keys = {("id", user_id)}
+keys.update(("email", email) for email in emails if email)
+with _user_cache_lock:
+snapshot = _user_cache.get(("id", user_id))
+if snapshot:
+keys.add(("email", snapshot["email"]))
+for key in keys:
+_user_cache.pop(key, None)
+session.info.setdefault(_EVICT_USERS, set()).update(keys)
+@event.listens_for(Session, "after_flush")
+def _evict_flushed_users(session: Session, flush_context) -> None:
+# Any ORM change to a user (role, is_active, email, ...) from any code path
+for obj in (*session.dirty, *session.deleted):
+if isinstance(obj, User):
+_evict_users(session, obj.id, obj.email, *inspect(obj).attrs.email.history.deleted)
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session: Session) -> None:
+keys = session.info.pop(_EVICT_USERS, None)
+if keys:
+with _user_cache_lock:
+for key in keys:
+_user_cache.pop(key, None)
+@event.listens_for(Session, "after_rollback")
+def _forget_user_evictions(session: Session) -> None:
+session.info.pop(_EVICT_USERS, None)
+class UserRepository(BaseRepository):
+def _cached(self, key: Tuple[str, str]) -> Optional[User]:
+with _user_cache_lock:
+snapshot = _user_cache.get(key)
+if snapshot is None:
+return None
+user = User(**snapshot)
+make_transient_to_detached(user)
+return self.db.merge(user, load=False)
+def _remember(self, user: User) -> None:
+snapshot = {key: getattr(user, key) for key in _USER_COLUMNS}
+with _user_cache_lock:
+_user_cache[("id", user.id)] = snapshot
+_user_cache[("email", user.email)] = snapshot
+def invalidate(self, user_id: str, *emails: str) -> None:
+"""
+Drop a user from the lookup cache after it changes. ORM attribute
+edits are evicted automatically on flush; bulk UPDATE/DELETE
+statements against users must call this.
+"""
+_evict_users(self.db, user_id, *emails)
+# Single-row lookups use lambda statements so the compiled SQL is cached
+# across calls and only the bound parameter changes
 def get_by_id(self, user_id: str) -> Optional[User]:
-return self.db.query(User).filter(User.id == user_id).first()
+user = self._cached(("id", user_id))
+if user is None:
+stmt = lambda_stmt(lambda: select(User).where(User.id == user_id))
+user = self.db.execute(stmt).scalars().first()
+if user is not None:
+self._remember(user)
+return user
 def get_by_email(self, email: str) -> Optional[User]:
-return self.db.query(User).filter(User.email == email).first()
+user = self._cached(("email", email))
+if user is None:
+stmt = lambda_stmt(lambda: select(User).where(User.email == email))
+user = self.db.execute(stmt).scalars().first()
+if user is not None:
+self._remember(user)
+return user
 def create(self, email: str, full_name: str = None, organization: str = None) -> User:
-user = User(
-email=email,
-full_name=full_name,
-organization=organization
-)
-self.db.add(user)
-self.db.commit()
-self.db.refresh(user)
+user = self.db.scalars(
+insert(User).returning(User),
+[{"email": email, "full_name": full_name, "organization": organization}]
+).one()
+self._commit(user)
 return user
 def update_last_login(self, user_id: str) -> None:
 self.db.query(User).filter(User.id == user_id).update({
-"last_login_at": datetime.utcnow()
+"last_login_at": func.now()
 })
-self.db.commit()
+self.invalidate(user_id)
+self._commit()
 # ==================== CONTRACT REPOSITORY ====================
-class ContractRepository:
-def __init__(self, db: Session):
-self.db = db
+# Columns that ContractRepository.update may write (generated columns excluded)
+_CONTRACT_COLUMNS = frozenset(c.key for c in Contract.__table__.columns if c.computed is None)
+class ContractRepository(BaseRepository):
 def get_by_id(self, contract_id: str) -> Optional[Contract]:
-return self.db.query(Contract).filter(Contract.id == contract_id).first()
+stmt = lambda_stmt(lambda: select(Contract).where(Contract.id == contract_id))
+return self.db.execute(stmt).scalars().first()
 def get_by_owner(
 self, owner_id: str, status: str = None,
 jurisdiction: str = None,
 limit: int = 100,
-offset: int = 0
-) -> List[Contract]:
-query = self.db.query(Contract).filter(Contract.owner_id == owner_id)
+cursor: Optional[PageCursor] = None,
+with_relations: Tuple[str, ...] = ()
+) -> Tuple[List[Contract], Optional[PageCursor]]:
+"""
+List an owner's contracts, newest first, one keyset page at a time.
+Returns (contracts, next_cursor) -- not a bare list, and there is no
+offset argument any more. Pass next_cursor back to fetch the next page;
+it is None on the last page. Each page is an index range scan
+regardless of depth.
+List views that touch related rows should pass e.g.
+with_relations=("analyses",) so each relationship is loaded in one
+batched IN query instead of one lazy SELECT per contract.
+"""
+query = (
+self.db.query(Contract)
+.options(*[selectinload(getattr(Contract, rel)) for rel in with_relations])
+.filter(Contract.owner_id == owner_id)
+)
 if status:
 query = query.filter(Contract.status == status)
 if jurisdiction:
 query = query.filter(Contract.jurisdiction == jurisdiction)
-return query.order_by(desc(Contract.created_at)).limit(limit).offset(offset).all()
+if cursor:
+query = query.filter(tuple_(Contract.created_at, Contract.id) < cursor)
+contracts = query.order_by(desc(Contract.created_at), desc(Contract.id)).limit(limit).all()
+return contracts, _next_cursor(contracts, limit)
+def search(self, query: str, owner_id: str = None, limit: int = 50) -> List[Contract]:
+"""Full-text search over contract text (web-search syntax), served by the GIN index."""
+tsquery = func.websearch_to_tsquery("english", query)
+q = self.db.query(Contract).filter(Contract.content_tsv.op("@@")(tsquery))
+if owner_id:
+q = q.filter(Contract.owner_id == owner_id)
+return q.order_by(desc(func.ts_rank(Contract.content_tsv, tsquery))).limit(limit).all()
+def find_by_tag(self, tag: str, owner_id: str = None, limit: int = 100) -> List[Contract]:
+"""Contracts whose tags contain tag (JSONB @>, served by the jsonb_path_ops index)."""
+q = self.db.query(Contract).filter(Contract.tags.op("@>")(cast([tag], JSONB)))
+if owner_id:
+q = q.filter(Contract.owner_id == owner_id)
+return q.order_by(desc(Contract.created_at)).limit(limit).all()
+def search_clauses(self, query: str, contract_id: str = None, limit: int = 50) -> List[Clause]:
+"""Full-text search over clause text."""
+tsquery = func.websearch_to_tsquery("english", query)
+q = self.db.query(Clause).filter(Clause.text_tsv.op("@@")(tsquery))
+if contract_id:
+q = q.filter(Clause.contract_id == contract_id)
+return q.order_by(desc(func.ts_rank(Clause.text_tsv, tsquery))).limit(limit).all()
+def list_summaries(
+self, owner_id: str, limit: int = 100, cursor: Optional[PageCursor] = None
+) -> Tuple[List[Row], Optional[PageCursor]]:
+"""
+(id, name, status, latest_risk_score, created_at) rows for list views;
+skips loading content_text and the JSONB columns. Keyset-paginated like
+get_by_owner: returns (rows, next_cursor).
+"""
+stmt = (
+select(
+Contract.id, Contract.name, Contract.status,
+Contract.latest_risk_score, Contract.created_at
+)
+.where(Contract.owner_id == owner_id)
+)
+if cursor:
+stmt = stmt.where(tuple_(Contract.created_at, Contract.id) < cursor)
+rows = self.db.execute(stmt.order_by(desc(Contract.created_at), desc(Contract.id)).limit(limit)).all()
+return rows, _next_cursor(rows, limit)
 def count_by_owner(self, owner_id: str, status: str = None) -> int:
 query = self.db.query(Contract).filter(Contract.owner_id == owner_id)
 if status:
@@ -63,73 +258,111 @@ content_text: str = None,
 jurisdiction: str = "INTERNATIONAL",
 **kwargs
 ) -> Contract:
-contract = Contract(
-owner_id=owner_id,
-name=name,
-content_text=content_text,
-jurisdiction=jurisdiction,
+contract = self.db.scalars(
+insert(Contract).returning(Contract),
+[{
+"owner_id": owner_id,
+"name": name,
+"content_text": content_text,
+"jurisdiction": jurisdiction,
 **kwargs
-)
-self.db.add(contract)
-self.db.commit()
-self.db.refresh(contract)
+}]
+).one()
+self._commit(contract)
 return contract
-def update(self, contract_id: str, **updates) -> Optional[Contract]:
-contract = self.get_by_id(contract_id)
-if not contract:
+def create_with_hash(self, owner_id: str, name: str, content: bytes, **kwargs) -> Contract:
+"""
+Create a contract, recording the SHA-256 of its original file bytes.
+hashlib hashes via OpenSSL (SHA-NI where available); the memoryview
+avoids copying large uploads.
+"""
+content_hash = hashlib.sha256(memoryview(content)).hexdigest()
+return self.create(owner_id, name, content_hash=content_hash, **kwargs)
+def update(self, contract_id: str, fetch: bool = True, **updates) -> Optional[Contract]:
+"""
+Apply column updates in a single UPDATE, stamping updated_at with the
+database clock. Unknown keys are ignored. The updated row is re-read
+only when fetch is True; otherwise None is returned.
+"""
+values = {key: value for key, value in updates.items() if key in _CONTRACT_COLUMNS}
+values["updated_at"] = func.now()
+updated = self.db.query(Contract).filter(Contract.id == contract_id).update(
+values, synchronize_session="fetch"
+)
+self._commit()
+if not updated or not fetch:
 return None
-for key, value in updates.items():
-if hasattr(contract, key):
-setattr(contract, key, value)
-contract.updated_at = datetime.utcnow()
-self.db.commit()
-self.db.refresh(contract)
-return contract
+return self.get_by_id(contract_id)
 def update_risk(self, contract_id: str, risk_score: int) -> None:
-contract = self.get_by_id(contract_id)
-if contract:
-old_risk = contract.latest_risk_score
-contract.latest_risk_score = risk_score
-# Calculate trend
-if old_risk is not None:
-if risk_score > old_risk + 5:
-contract.risk_trend = "increasing"
-elif risk_score < old_risk - 5:
-contract.risk_trend = "decreasing"
-else:
-contract.risk_trend = "stable"
-self.db.commit()
+# Single UPDATE; the trend CASE compares against the pre-update score server-side
+old_risk = Contract.latest_risk_score
+self.db.query(Contract).filter(Contract.id == contract_id).update({
+"latest_risk_score": risk_score,
+"risk_trend": case(
+(old_risk.is_(None), Contract.risk_trend),
+(old_risk + 5 < risk_score, "increasing"),
+(old_risk - 5 > risk_score, "decreasing"),
+else_="stable"
+)
+}, synchronize_session="fetch")
+self._commit()
 def delete(self, contract_id: str) -> bool:
 contract = self.get_by_id(contract_id)
 if contract:
 self.db.delete(contract)
-self.db.commit()
+self._commit()
 return True
 return False
 def archive(self, contract_id: str) -> Optional[Contract]:
 return self.update(contract_id, status="archived")
 # ==================== ANALYSIS REPOSITORY ====================
-class AnalysisRepository:
-def __init__(self, db: Session):
-self.db = db
+class AnalysisRepository(BaseRepository):
 def get_by_id(self, analysis_id: str) -> Optional[Analysis]:
-return self.db.query(Analysis).filter(Analysis.id == analysis_id).first()
+stmt = lambda_stmt(lambda: select(Analysis).where(Analysis.id == analysis_id))
+return self.db.execute(stmt).scalars().first()
 def get_by_user(
 self, user_id: str,
 limit: int = 50,
-offset: int = 0
-) -> List[Analysis]:
-return (
+cursor: Optional[PageCursor] = None,
+with_relations: Tuple[str, ...] = ()
+) -> Tuple[List[Analysis], Optional[PageCursor]]:
+"""
+Keyset-paginated analyses for a user, newest first.
+Returns (analyses, next_cursor) rather than a bare list; see
+ContractRepository.get_by_owner for the cursor protocol.
+"""
+query = (
 self.db.query(Analysis)
+.options(*[selectinload(getattr(Analysis, rel)) for rel in with_relations])
 .filter(Analysis.user_id == user_id)
-.order_by(desc(Analysis.created_at))
-.limit(limit)
-.offset(offset)
-.all()
 )
-def get_by_contract(self, contract_id: str) -> List[Analysis]:
+if cursor:
+query = query.filter(tuple_(Analysis.created_at, Analysis.id) < cursor)
+analyses = query.order_by(desc(Analysis.created_at), desc(Analysis.id)).limit(limit).all()
+return analyses, _next_cursor(analyses, limit)
+def list_summaries(
+self, user_id: str, limit: int = 50, cursor: Optional[PageCursor] = None
+) -> Tuple[List[Row], Optional[PageCursor]]:
+"""
+(id, contract_id, risk_score, verdict, created_at) rows for list views;
+skips loading input text, agent outputs and full_report. Keyset-paginated
+like get_by_user: returns (rows, next_cursor).
+"""
+stmt = (
+select(
+Analysis.id, Analysis.contract_id, Analysis.risk_score,
+Analysis.verdict, Analysis.created_at
+)
+.where(Analysis.user_id == user_id)
+)
+if cursor:
+stmt = stmt.where(tuple_(Analysis.created_at, Analysis.id) < cursor)
+rows = self.db.execute(stmt.order_by(desc(Analysis.created_at), desc(Analysis.id)).limit(limit)).all()
+return rows, _next_cursor(rows, limit)
+def get_by_contract(self, contract_id: str, with_relations: Tuple[str, ...] = ()) -> List[Analysis]:
 return (
 self.db.query(Analysis)
+.options(*[selectinload(getattr(Analysis, rel)) for rel in with_relations])
 .filter(Analysis.contract_id == contract_id)
 .order_by(desc(Analysis.created_at))
 .all()
@@ -143,42 +376,53 @@ verdict: str,
 contract_id: str = None,
 **kwargs
 ) -> Analysis:
-analysis = Analysis(
-user_id=user_id,
-contract_id=contract_id,
-input_text=input_text,
-risk_score=risk_score,
-verdict=verdict,
+analysis = self.db.scalars(
+insert(Analysis).returning(Analysis),
+[{
+"user_id": user_id,
+"contract_id": contract_id,
+"input_text": input_text,
+"risk_score": risk_score,
+"verdict": verdict,
 **kwargs
-)
-self.db.add(analysis)
-self.db.commit()
-self.db.refresh(analysis)
+}]
+).one()
+self._commit(analysis)
 return analysis
 def get_stats(self, user_id: str, days: int = 30) -> Dict[str, Any]:
 """Get analysis statistics for a user."""
-cutoff = datetime.utcnow() - timedelta(days=days)
-analyses = (
-self.db.query(Analysis)
+cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+# Aggregate in SQL so no Analysis rows (or their JSON/text payloads) are loaded
+count, avg_risk, avg_ms, plaintiff, defense = (
+self.db.query(
+func.count(Analysis.id),
+func.avg(Analysis.risk_score),
+func.avg(Analysis.processing_time_ms),
+func.sum(case((Analysis.verdict == "PLAINTIFF_FAVOR", 1), else_=0)),
+func.sum(case((Analysis.verdict == "DEFENSE_FAVOR", 1), else_=0))
+)
 .filter(Analysis.user_id == user_id)
 .filter(Analysis.created_at >= cutoff)
-.all()
+.one()
 )
-if not analyses:
+if not count:
 return {"count": 0, "avg_risk": 0, "avg_processing_ms": 0}
-risks = [a.risk_score for a in analyses if a.risk_score is not None]
-times = [a.processing_time_ms for a in analyses if a.processing_time_ms is not None]
 return {
-"count": len(analyses),
-"avg_risk": sum(risks) / len(risks) if risks else 0,
-"avg_processing_ms": sum(times) / len(times) if times else 0,
-"plaintiff_favor_count": sum(1 for a in analyses if a.verdict == "PLAINTIFF_FAVOR"),
-"defense_favor_count": sum(1 for a in analyses if a.verdict == "DEFENSE_FAVOR")
+"count": count,
+"avg_risk": float(avg_risk) if avg_risk is not None else 0,
+"avg_processing_ms": float(avg_ms) if avg_ms is not None else 0,
+"plaintiff_favor_count": int(plaintiff or 0),
+"defense_favor_count": int(defense or 0)
 }
 # ==================== AUDIT REPOSITORY ====================
-class AuditRepository:
-def __init__(self, db: Session):
-self.db = db
+# Audit commits skip the WAL fsync wait unless strict durability is required
+AUDIT_ASYNC_COMMIT = os.getenv("BALE_AUDIT_ASYNC_COMMIT", "true").lower() == "true"
+class AuditRepository(BaseRepository):
+def _relax_durability(self) -> None:
+"""Let this transaction's commit return once WAL is buffered, not flushed."""
+# SET LOCAL would cover the whole transaction, so never relax a shared unit of work
+if AUDIT_ASYNC_COMMIT and not self.in_unit_of_work:
+self.db.execute(text("SET LOCAL synchronous_commit = off"))
 def log(
 self,
 action: str,
@@ -192,21 +436,35 @@ ip_address: str = None,
 user_agent: str = None,
 error_message: str = None
 ) -> AuditLog:
-log = AuditLog(
-user_id=user_id,
-api_key_id=api_key_id,
-action=action,
-resource_type=resource_type,
-resource_id=resource_id,
-request_data=request_data,
-response_status=response_status,
-ip_address=ip_address,
-user_agent=user_agent,
-error_message=error_message
-)
-self.db.add(log)
-self.db.commit()
+self._relax_durability()
+# INSERT ... RETURNING hydrates the row in the same round trip
+log = self.db.scalars(
+insert(AuditLog).returning(AuditLog),
+[{
+"user_id": user_id,
+"api_key_id": api_key_id,
+"action": action,
+"resource_type": resource_type,
+"resource_id": resource_id,
+"request_data": request_data,
+"response_status": response_status,
+"ip_address": ip_address,
+"user_agent": user_agent,
+"error_message": error_message
+}]
+).one()
+self._commit(log)
 return log
+def log_many(self, records: List[Dict[str, Any]]) -> None:
+"""
+Write a batch of audit records (dicts of AuditLog fields) with one
+executemany INSERT and a single commit.
+"""
+if not records:
+return
+self._relax_durability()
+self.db.execute(insert(AuditLog), records)
+self._commit()
 def get_by_user(
 self, user_id: str, action: str = None,
 limit: int = 100
@@ -216,9 +474,7 @@ if action:
 query = query.filter(AuditLog.action == action)
 return query.order_by(desc(AuditLog.created_at)).limit(limit).all()
 # ==================== TRAINING DATA REPOSITORY ====================
-class TrainingDataRepository:
-def __init__(self, db: Session):
-self.db = db
+class TrainingDataRepository(BaseRepository):
 def create(
 self,
 input_text: str,
@@ -228,18 +484,56 @@ task_type: str = "interpretation",
 domain: str = "commercial",
 difficulty: str = "medium"
 ) -> TrainingExample:
-example = TrainingExample(
-input_text=input_text,
-expected_output=expected_output,
-source_type=source_type,
-task_type=task_type,
-domain=domain,
-difficulty=difficulty
-)
-self.db.add(example)
-self.db.commit()
-self.db.refresh(example)
+example = self.db.scalars(
+insert(TrainingExample).returning(TrainingExample),
+[{
+"input_text": input_text,
+"expected_output": expected_output,
+"source_type": source_type,
+"task_type": task_type,
+"domain": domain,
+"difficulty": difficulty
+}]
+).one()
+self._commit(example)
 return example
+def bulk_create(self, rows: Iterable[Dict[str, Any]], page_size: int = 1000) -> int:
+"""
+Insert many training examples with psycopg2's execute_values (multi-row
+VALUES pages) and one commit. Each row needs input_text and
+expected_output; the other fields fall back to create()'s defaults.
+Returns the number of rows inserted.
+"""
+from psycopg2.extras import execute_values
+values = [
+(
+generate_uuid(),
+r["input_text"],
+r["expected_output"],
+r.get("source_type", "synthetic"),
+r.get("task_type", "interpretation"),
+r.get("domain", "commercial"),
+r.get("difficulty", "medium"),
+False,
+False
+)
+for r in rows
+]
+if not values:
+return 0
+cursor = self.db.connection().connection.cursor()
+try:
+execute_values(
+cursor,
+"INSERT INTO training_examples (id, input_text, expected_output, source_type, "
+"task_type, domain, difficulty, is_validated, is_used_in_training) VALUES %s",
+values,
+page_size=page_size
+)
+finally:
+cursor.close()
+self._commit()
+return len(values)
 def get_for_training(
 self, task_type: str = None,
 validated_only: bool = True,
@@ -251,14 +545,41 @@ query = query.filter(TrainingExample.is_validated == True)
 if task_type:
 query = query.filter(TrainingExample.task_type == task_type)
 return query.filter(TrainingExample.is_used_in_training == False).limit(limit).all()
+def iter_for_training(
+self, task_type: str = None,
+validated_only: bool = True,
+limit: int = 10000,
+batch_size: int = 500
+) -> Iterator[Row]:
+"""
+Stream (id, input_text, expected_output) rows of unused examples.
+Rows are fetched batch_size at a time as plain tuples rather than
+materializing every TrainingExample object up front. The server-side
+cursor lives until the generator is exhausted, so do not commit on this
+session (e.g. mark_used) while iterating; collect ids and mark them after.
+"""
+stmt = select(
+TrainingExample.id,
+TrainingExample.input_text,
+TrainingExample.expected_output
+).where(TrainingExample.is_used_in_training == False)
+if validated_only:
+stmt = stmt.where(TrainingExample.is_validated == True)
+if task_type:
+stmt = stmt.where(TrainingExample.task_type == task_type)
+result = self.db.execute(stmt.limit(limit).execution_options(yield_per=batch_size))
+for partition in result.partitions():
+yield from partition
 def mark_used(self, example_ids: List[str], training_run_id: str) -> None:
+# One uuid[] parameter instead of an IN list with a bind per id
+ids = cast(list(example_ids), ARRAY(UUID(as_uuid=False)))
 self.db.query(TrainingExample).filter(
-TrainingExample.id.in_(example_ids)
+TrainingExample.id == any_(ids)
 ).update({
 "is_used_in_training": True,
 "training_run_id": training_run_id
 }, synchronize_session=False)
-self.db.commit()
+self._commit()
 def validate(self, example_id: str, validator_id: str, quality_score: float) -> None:
 self.db.query(TrainingExample).filter(
 TrainingExample.id == example_id
@@ -266,9 +587,9 @@ TrainingExample.id == example_id
 "is_validated": True,
 "validator_id": validator_id,
 "quality_score": quality_score,
-"validated_at": datetime.utcnow()
+"validated_at": func.now()
 })
-self.db.commit()
+self._commit()
 def get_stats(self) -> Dict[str, Any]:
 total = self.db.query(TrainingExample).count()
 validated = self.db.query(TrainingExample).filter(
@@ -7,24 +7,26 @@ Includes:
 - Multi-language examples (French, German)
 - Real-world contract patterns
 """
-import json
 import os
-from typing import List, Dict, Any
+import functools
+from types import MappingProxyType
+from typing import List, Dict, Any, Mapping, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+from src.jsonio import read_json, write_json
 class TestCategory(Enum):
 CLASSIFICATION = "classification"
 RISK_DETECTION = "risk_detection"
 EDGE_CASE = "edge_case"
 MULTILINGUAL = "multilingual"
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BenchmarkTestCase:
 """A single benchmark test case."""
 id: str
 category: str
 input_text: str
 expected_output: str
-additional_expected: Dict[str, Any] # Additional fields to check
+additional_expected: Mapping[str, Any] # Additional fields to check (read-only)
 language: str = "en"
 difficulty: str = "standard" # standard, edge_case, multilingual
 source: str = "synthetic"
@@ -321,6 +323,33 @@ MULTILINGUAL_TESTS = [
 "category": "risk"
 },
 ]
+def _to_test_cases(tests: List[Dict], default_category: str) -> List[BenchmarkTestCase]:
+extra_keys = ("problems", "notes")
+return [
+BenchmarkTestCase(
+id=test["id"],
+category=test.get("category", default_category),
+input_text=test["input"],
+expected_output=test["expected"],
+# Cases are cached and shared by all_tests(), so nothing mutable is exposed
+additional_expected=MappingProxyType({
+k: tuple(test[k]) if isinstance(test[k], list) else test[k]
+for k in extra_keys if k in test
+}),
+language=test.get("language", "en"),
+difficulty=test["difficulty"]
+)
+for test in tests
+]
+@functools.cache
+def all_tests() -> Tuple[BenchmarkTestCase, ...]:
+"""Every benchmark case as immutable BenchmarkTestCase objects, built once."""
+return tuple(
+_to_test_cases(CLASSIFICATION_TESTS, TestCategory.CLASSIFICATION.value)
++ _to_test_cases(RISK_DETECTION_TESTS, TestCategory.RISK_DETECTION.value)
++ _to_test_cases(EDGE_CASE_TESTS, "classification")
++ _to_test_cases(MULTILINGUAL_TESTS, "classification")
+)
 def build_benchmark_dataset(output_path: str = "evaluation/benchmark_v5.json"):
 """Build the complete benchmark dataset."""
 benchmark = {
@@ -381,24 +410,33 @@ for cat, tests in benchmark["categories"].items():
 benchmark["total_cases"] += len(tests)
 # Save
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
-with open(output_path, 'w') as f:
-json.dump(benchmark, f, indent=2, ensure_ascii=False)
+write_json(output_path, benchmark)
 print(f"Benchmark dataset saved to {output_path}")
 print(f"Total test cases: {benchmark['total_cases']}")
 for cat, tests in benchmark["categories"].items():
 print(f" {cat}: {len(tests)}")
 return benchmark
-def run_benchmark(model_path: str = "models/bale-legal-lora-v5"):
-"""Run benchmark evaluation against the V5 model."""
+def _predict_mixed(predictions, tests: List[Dict]) -> List[str]:
+"""
+Predictions for a mix of risk and classification tests: risk level for
+category "risk", clause type otherwise. Each kind runs as one batched call.
+"""
+is_risk = [t.get("category", "classification") == "risk" for t in tests]
+risks = iter(predictions.risk_levels([t["input"] for t, r in zip(tests, is_risk) if r]))
+types = iter(predictions.clause_types([t["input"] for t, r in zip(tests, is_risk) if not r]))
+return [next(risks) if r else next(types) for r in is_risk]
+def run_benchmark(model_path: str = "models/bale-legal-lora-v5", use_cache: bool = True):
+"""Run benchmark evaluation against the V5 model (use_cache=False re-runs every prediction)."""
 from src.inference.local_v5 import BALELocalInference
+from evaluation.inference_cache import CachedPredictions
 print("Loading benchmark...")
-with open("evaluation/benchmark_v5.json") as f:
-benchmark = json.load(f)
+benchmark = read_json("evaluation/benchmark_v5.json")
 print(f"Loading V5 model from {model_path}...")
 engine = BALELocalInference(adapter_path=model_path)
 if not engine.load():
 print("ERROR: Failed to load model")
 return
+predictions = CachedPredictions(engine, enabled=use_cache)
 results = {
 "classification": {"correct": 0, "total": 0, "details": []},
 "risk_detection": {"correct": 0, "total": 0, "details": []},
@@ -407,41 +445,36 @@ results = {
 }
 # Run classification tests
 print("\nRunning classification tests...")
-for test in benchmark["categories"]["classification"]:
-result = engine.classify_clause(test["input"])
-is_correct = test["expected"].lower() in result.clause_type.lower()
+tests = benchmark["categories"]["classification"]
+for test, got in zip(tests, predictions.clause_types([t["input"] for t in tests])):
+is_correct = test["expected"].lower() in got.lower()
 results["classification"]["total"] += 1
 if is_correct:
 results["classification"]["correct"] += 1
 results["classification"]["details"].append({
 "id": test["id"],
 "expected": test["expected"],
-"got": result.clause_type,
+"got": got,
 "correct": is_correct
 })
 # Run risk tests
 print("Running risk detection tests...")
-for test in benchmark["categories"]["risk_detection"]:
-result = engine.analyze_risk(test["input"])
-is_correct = test["expected"].upper() == result.level.value.upper()
+tests = benchmark["categories"]["risk_detection"]
+for test, got in zip(tests, predictions.risk_levels([t["input"] for t in tests])):
+is_correct = test["expected"].upper() == got.upper()
 results["risk_detection"]["total"] += 1
 if is_correct:
 results["risk_detection"]["correct"] += 1
 results["risk_detection"]["details"].append({
 "id": test["id"],
 "expected": test["expected"],
-"got": result.level.value,
+"got": got,
 "correct": is_correct
 })
 # Run edge cases
 print("Running edge case tests...")
-for test in benchmark["categories"]["edge_cases"]:
-if test["category"] == "risk":
-result = engine.analyze_risk(test["input"])
-got = result.level.value
-else:
-result = engine.classify_clause(test["input"])
-got = result.clause_type
+tests = benchmark["categories"]["edge_cases"]
+for test, got in zip(tests, _predict_mixed(predictions, tests)):
 is_correct = test["expected"].lower() in got.lower()
 results["edge_cases"]["total"] += 1
 if is_correct:
@@ -454,14 +487,8 @@ results["edge_cases"]["details"].append({
 })
 # Run multilingual
 print("Running multilingual tests...")
-for test in benchmark["categories"]["multilingual"]:
-cat = test.get("category", "classification")
-if cat == "risk":
-result = engine.analyze_risk(test["input"])
-got = result.level.value
-else:
-result = engine.classify_clause(test["input"])
-got = result.clause_type
+tests = benchmark["categories"]["multilingual"]
+for test, got in zip(tests, _predict_mixed(predictions, tests)):
 is_correct = test["expected"].lower() in got.lower()
 results["multilingual"]["total"] += 1
 if is_correct:
@@ -473,6 +500,7 @@ results["multilingual"]["details"].append({
 "got": got,
 "correct": is_correct
 })
+predictions.save()
 # Print summary
 print("\n" + "=" * 60)
 print("BENCHMARK RESULTS")
@@ -489,13 +517,12 @@ print("-" * 60)
 print(f"{'OVERALL':20} {overall_correct}/{overall_total} ({overall_acc:.1f}%)")
 # Save results
 results_path = "evaluation/benchmark_results_v5.json"
-with open(results_path, 'w') as f:
-json.dump(results, f, indent=2)
+write_json(results_path, results)
 print(f"\nDetailed results saved to {results_path}")
 return results
 if __name__ == "__main__":
 import sys
 if len(sys.argv) > 1 and sys.argv[1] == "run":
-run_benchmark()
+run_benchmark(use_cache="--no-cache" not in sys.argv[2:])
 else:
 build_benchmark_dataset()
@@ -8,11 +8,11 @@ Includes:
 - Employment Law (Non-compete, Severance, etc.)
 - M&A (Reps & Warranties, indemnification, etc.)
 """
-import json
 import os
 from typing import List, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
+from src.jsonio import read_json, write_json
 # [PREVIOUS TESTS REMAIN SAME - RE-INCLUDED FOR COMPLETENESS]
 CLASSIFICATION_TESTS = [
 {"id": "class_001", "input": "The Vendor shall indemnify, defend, and hold harmless the Customer.", "expected": "indemnification", "difficulty": "standard"},
@@ -66,41 +66,45 @@ for cat in benchmark["categories"].values():
 count += len(cat)
 benchmark["total_cases"] = count
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
-with open(output_path, 'w') as f:
-json.dump(benchmark, f, indent=2, ensure_ascii=False)
+write_json(output_path, benchmark)
 print(f"Benchmark V7 saved to {output_path} with {count} cases.")
 return benchmark
-def run_benchmark(model_path: str = "models/bale-legal-lora-v7"):
-"""Run benchmark evaluation against the V7 model."""
+def run_benchmark(model_path: str = "models/bale-legal-lora-v7", use_cache: bool = True):
+"""Run benchmark evaluation against the V7 model (use_cache=False re-runs every prediction)."""
 from src.inference.local_v5 import BALELocalInference
+from evaluation.inference_cache import CachedPredictions
 ds_path = "evaluation/benchmark_v7.json"
 if not os.path.exists(ds_path):
 build_benchmark_dataset(ds_path)
 print(f"Loading benchmark from {ds_path}...")
-with open(ds_path) as f:
-benchmark = json.load(f)
+benchmark = read_json(ds_path)
 print(f"Loading model from {model_path}...")
 engine = BALELocalInference(adapter_path=model_path)
 if not engine.load():
 print("ERROR: Failed to load model")
 return
+predictions = CachedPredictions(engine, enabled=use_cache)
 results = {}
 for category, tests in benchmark["categories"].items():
 print(f"\nRunning {category} tests...")
 cat_results = {"correct": 0, "total": 0, "details": []}
-for test in tests:
+# Determine if risk or classification, then run each kind as batched inference
+risk_flags = [test.get("category") == "risk" or category == "risk_detection" for test in tests]
+risk_results = iter(predictions.risk_levels(
+[t["input"] for t, is_risk in zip(tests, risk_flags) if is_risk]
+))
+class_results = iter(predictions.clause_types(
+[t["input"] for t, is_risk in zip(tests, risk_flags) if not is_risk]
+))
+for test, is_risk in zip(tests, risk_flags):
 cat_results["total"] += 1
-# Determine if risk or classification
-is_risk = test.get("category") == "risk" or category == "risk_detection"
 if is_risk:
-res = engine.analyze_risk(test["input"])
-got = res.level.value
+got = next(risk_results)
 expected = test["expected"]
 # Fuzzy match for risk (HIGH vs High)
 is_correct = got.upper() == expected.upper()
 else:
-res = engine.classify_clause(test["input"])
-got = res.clause_type
+got = next(class_results)
 expected = test["expected"]
 # Fuzzy match for classification (substring)
 is_correct = expected.lower() in got.lower().replace("_", " ") or \
@@ -117,6 +121,7 @@ cat_results["details"].append({
 results[category] = cat_results
 acc = (cat_results["correct"] / cat_results["total"] * 100) if cat_results["total"] else 0
 print(f" Result: {cat_results['correct']}/{cat_results['total']} ({acc:.1f}%)")
+predictions.save()
 # Overall
 total_correct = sum(r["correct"] for r in results.values())
 total_cases = sum(r["total"] for r in results.values())
@@ -124,11 +129,12 @@ overall = (total_correct / total_cases * 100) if total_cases else 0
 print("\n" + "="*40)
 print(f"OVERALL SCORE: {overall:.1f}% ({total_correct}/{total_cases})")
 print("="*40)
-with open("evaluation/benchmark_results_v7.json", "w") as f:
-json.dump(results, f, indent=2)
+write_json("evaluation/benchmark_results_v7.json", results)
 if __name__ == "__main__":
 import sys
-if len(sys.argv) > 1:
-run_benchmark(sys.argv[1])
+args = [a for a in sys.argv[1:] if a != "--no-cache"]
+use_cache = len(args) == len(sys.argv) - 1
+if args:
+run_benchmark(args[0], use_cache=use_cache)
 else:
-run_benchmark()
+run_benchmark(use_cache=use_cache)
@@ -0,0 +1,53 @@
+"""
+BALE Benchmark Inference Cache
+Memoizes model predictions by (task, input text) across benchmark
+categories and runs, persisted per adapter so V5 and V7 never mix.
+Entries are tied to the adapter weights' mtime and size, so retraining an
+adapter in place starts a fresh cache; pass enabled=False (--no-cache on
+the benchmark CLIs) to bypass it entirely.
+"""
+import os
+from typing import Any, Callable, Dict, List
+from src.jsonio import read_json, write_json
+CACHE_PATH = "evaluation/.infer_cache.json"
+ADAPTER_WEIGHTS = "adapters.safetensors"
+# Fallback values from failed or unparseable generations are never cached
+_UNCACHED = {"UNKNOWN", "unknown"}
+def _weights_fingerprint(adapter_path: str) -> str:
+"""mtime and size of the adapter weights ("" if missing)."""
+try:
+st = os.stat(os.path.join(adapter_path, ADAPTER_WEIGHTS))
+except OSError:
+return ""
+return f"{st.st_mtime_ns}:{st.st_size}"
+class CachedPredictions:
+"""Cached risk-level / clause-type predictions over a BALELocalInference engine."""
+def __init__(self, engine, path: str = CACHE_PATH, enabled: bool = True):
+self.engine = engine
+self.path = path
+self.enabled = enabled
+self._all: Dict[str, Dict[str, Any]] = {}
+if enabled and os.path.exists(path):
+self._all = read_json(path)
+# One entry per adapter path; different weights replace it rather than reuse it
+weights = _weights_fingerprint(engine.adapter_path)
+entry = self._all.get(engine.adapter_path)
+if not entry or entry.get("weights") != weights:
+entry = self._all[engine.adapter_path] = {"weights": weights, "tasks": {}}
+self._cache: Dict[str, Dict[str, str]] = entry["tasks"]
+def risk_levels(self, texts: List[str]) -> List[str]:
+return self._predict("risk", texts, lambda batch: [r.level.value for r in self.engine.analyze_risks_batch(batch)])
+def clause_types(self, texts: List[str]) -> List[str]:
+return self._predict("classify", texts, lambda batch: [r.clause_type for r in self.engine.classify_clauses_batch(batch)])
+def _predict(self, task: str, texts: List[str], run: Callable[[List[str]], List[str]]) -> List[str]:
+cache = self._cache.setdefault(task, {})
+# Only unseen, de-duplicated inputs reach the model
+misses = [t for t in dict.fromkeys(texts) if t not in cache]
+fresh = dict(zip(misses, run(misses))) if misses else {}
+cache.update((t, got) for t, got in fresh.items() if got not in _UNCACHED)
+return [cache[t] if t in cache else fresh[t] for t in texts]
+def save(self):
+if not self.enabled:
+return
+os.makedirs(os.path.dirname(self.path), exist_ok=True)
+write_json(self.path, self._all, indent=False)
@@ -2,7 +2,6 @@
 BALE Comprehensive Evaluation Runner
 Tests all frontier capabilities against the evaluation dataset.
 """
-import json
 import os
 import sys
 from pathlib import Path
@@ -13,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.frontier import analyze_contract_frontiers
 from src.negotiation import clause_negotiator
 from src.logger import setup_logger
+from src.jsonio import read_json, write_json
 logger = setup_logger("evaluation")
 class EvaluationRunner:
 """Runs comprehensive evaluation against the dataset."""
@@ -24,16 +24,14 @@ self.results = []
 def load_manifest(self) -> Dict[str, Any]:
 """Load the dataset manifest."""
 manifest_path = self.dataset_dir / "manifest.json"
-with open(manifest_path) as f:
-return json.load(f)
+return read_json(manifest_path)
 def load_contract(self, filename: str) -> Dict[str, Any]:
 """Load a single contract from the dataset."""
 filepath = self.dataset_dir / filename
 if not filepath.exists():
 logger.warning(f"Contract file not found: {filename}")
 return None
-with open(filepath) as f:
-return json.load(f)
+return read_json(filepath)
 def evaluate_contract(self, contract: Dict[str, Any]) -> Dict[str, Any]:
 """Run full evaluation on a single contract."""
 contract_id = contract.get("id", "unknown")
@@ -185,8 +183,7 @@ def save_results(self, results: Dict[str, Any], output_path: str = None):
 """Save evaluation results to file."""
 if output_path is None:
 output_path = self.dataset_dir.parent / f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-with open(output_path, "w") as f:
-json.dump(results, f, indent=2, default=str)
+write_json(output_path, results, default=str)
 logger.info(f"Results saved to: {output_path}")
 return output_path
 def generate_report(self, results: Dict[str, Any]) -> str:
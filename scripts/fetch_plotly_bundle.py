@@ -0,0 +1,23 @@
+"""
+BALE Plotly.js Bundle Fetcher
+Downloads the Plotly.js "finance" partial bundle (bar, indicator, pie, ...)
+into static/, where Streamlit serves it at /app/static/. Pinned to the
+plotly.js version of the installed plotly package. Run at image build time
+(see Dockerfile) so the app itself never reaches a CDN.
+"""
+import urllib.request
+from pathlib import Path
+from plotly.offline import get_plotlyjs_version
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+BUNDLE_NAME = "plotly-finance.min.js"
+def fetch_bundle(dest: Path = STATIC_DIR / BUNDLE_NAME) -> Path:
+url = f"https://cdn.plot.ly/plotly-finance-{get_plotlyjs_version()}.min.js"
+dest.parent.mkdir(parents=True, exist_ok=True)
+tmp = dest.with_suffix(".tmp")
+with urllib.request.urlopen(url, timeout=60) as response:
+tmp.write_bytes(response.read())
+tmp.replace(dest)
+return dest
+if __name__ == "__main__":
+path = fetch_bundle()
+print(f"Wrote {path} ({path.stat().st_size // 1024} KiB)")
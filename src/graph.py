@@ -58,9 +58,15 @@ except ImportError:
 # Fallback to basic
 return compile_basic_graph()
 # Convenience exports
+# Singleton: compiled graphs are stateless between invocations, so one
+# instance (and one set of agents / embedding models) serves every run
+_default_graph = None
 def get_default_graph():
-"""Get the default production graph."""
-return compile_graph(enhanced=True)
+"""Get the default production graph, compiled once per process."""
+global _default_graph
+if _default_graph is None:
+_default_graph = compile_graph(enhanced=True)
+return _default_graph
 if __name__ == "__main__":
 app = compile_graph()
 test_state = {
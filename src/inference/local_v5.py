@@ -8,8 +8,9 @@ Features:
 - No API calls required
 """
 import os
+import re
 import logging
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List
 from dataclasses import dataclass
 from enum import Enum
 logger = logging.getLogger(__name__)
@@ -20,6 +21,12 @@ MLX_AVAILABLE = True
 except ImportError:
 MLX_AVAILABLE = False
 logger.warning("mlx_lm not available - local inference disabled")
+# Batched generation is only in newer mlx_lm releases
+try:
+from mlx_lm import batch_generate
+MLX_BATCH_AVAILABLE = True
+except ImportError:
+MLX_BATCH_AVAILABLE = False
 class RiskLevel(Enum):
 LOW = "LOW"
 MEDIUM = "MEDIUM"
@@ -40,6 +47,15 @@ clause_type: str
 confidence: float
 reasoning: str
 key_indicators: List[str]
+# Common clause types, in detection priority order
+CLAUSE_TYPES = (
+"INDEMNIFICATION", "INSURANCE", "CONFIDENTIALITY", "TERMINATION",
+"LIABILITY", "GOVERNING LAW", "WARRANTY", "INTELLECTUAL PROPERTY",
+"NON-COMPETE", "PAYMENT", "FORCE MAJEURE", "ARBITRATION"
+)
+# One alternation finds every clause-type mention in a single pass over the text
+_CLAUSE_TYPE_RE = re.compile("|".join(re.escape(ct) for ct in CLAUSE_TYPES))
+_CLAUSE_TYPE_RANK = {ct: i for i, ct in enumerate(CLAUSE_TYPES)}
 class BALELocalInference:
 """Local V5 inference engine using MLX."""
 MODEL_ID = "mlx-community/Mistral-7B-Instruct-v0.3-4bit"
@@ -87,14 +103,7 @@ reasoning="Model not available",
 problems=[],
 recommendations=[]
 )
-# Detect language (simple heuristic)
-lang_instruction = "Analyze this clause for consumer risk."
-if "est" in clause_text and "le" in clause_text: # Very basic FR detection
-lang_instruction = "Analysez cette clause pour le risque consommateur."
-elif "und" in clause_text and "der" in clause_text: # Very basic DE detection
-lang_instruction = "Analysieren Sie diese Klausel auf Verbraucherrisiko."
-messages = [{"role": "user", "content": f"{lang_instruction}\n\n{clause_text[:2000]}"}]
-prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+prompt = self._risk_prompt(clause_text)
 try:
 response = generate(
 self.model,
@@ -122,14 +131,7 @@ confidence=0.0,
 reasoning="Model not available",
 key_indicators=[]
 )
-# Detect language
-lang_instruction = "Classify this contract clause."
-if "est" in clause_text and "le" in clause_text:
-lang_instruction = "Classifiez cette clause contractuelle."
-elif "und" in clause_text and "der" in clause_text:
-lang_instruction = "Klassifizieren Sie diese Vertragsklausel."
-messages = [{"role": "user", "content": f"{lang_instruction}\n\n{clause_text[:2000]}"}]
-prompt = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+prompt = self._classification_prompt(clause_text)
 try:
 response = generate(
 self.model,
@@ -147,6 +149,72 @@ confidence=0.0,
 reasoning=f"Classification failed: {str(e)}",
 key_indicators=[]
 )
+def analyze_risks_batch(self, clause_texts: List[str], batch_size: int = 16) -> List[RiskAnalysisResult]:
+"""Risk analysis for many clauses, generated in length-bucketed batches."""
+return self._run_batched(
+clause_texts, batch_size, self._risk_prompt, 200,
+self._parse_risk_response, self.analyze_risk
+)
+def classify_clauses_batch(self, clause_texts: List[str], batch_size: int = 16) -> List[ClassificationResult]:
+"""Classification for many clauses, generated in length-bucketed batches."""
+return self._run_batched(
+clause_texts, batch_size, self._classification_prompt, 150,
+self._parse_classification_response, self.classify_clause
+)
+def _run_batched(
+self,
+clause_texts: List[str],
+batch_size: int,
+build_prompt: Callable[[str], str],
+max_tokens: int,
+parse: Callable,
+single: Callable
+) -> list:
+"""
+Run one generation per batch of prompts. Inputs are sorted by length so
+each batch pads as little as possible; results come back in input order.
+Falls back to per-clause calls when batched generation is unavailable.
+"""
+if not MLX_BATCH_AVAILABLE or not (self._loaded or self.load()):
+return [single(text) for text in clause_texts]
+order = sorted(range(len(clause_texts)), key=lambda i: len(clause_texts[i]))
+results = [None] * len(clause_texts)
+for start in range(0, len(order), batch_size):
+idxs = order[start:start + batch_size]
+prompts = [self._encode(build_prompt(clause_texts[i])) for i in idxs]
+try:
+responses = batch_generate(
+self.model, self.tokenizer, prompts,
+max_tokens=max_tokens, verbose=False
+).texts
+except Exception as e:
+logger.error(f"Batched generation failed, running clauses individually: {e}")
+responses = None
+for j, i in enumerate(idxs):
+results[i] = parse(responses[j]) if responses is not None else single(clause_texts[i])
+return results
+def _encode(self, prompt: str) -> List[int]:
+# Chat templates usually include BOS already; don't add a second one
+bos = self.tokenizer.bos_token
+return self.tokenizer.encode(prompt, add_special_tokens=bos is None or not prompt.startswith(bos))
+def _risk_prompt(self, clause_text: str) -> str:
+# Detect language (simple heuristic)
+lang_instruction = "Analyze this clause for consumer risk."
+if "est" in clause_text and "le" in clause_text: # Very basic FR detection
+lang_instruction = "Analysez cette clause pour le risque consommateur."
+elif "und" in clause_text and "der" in clause_text: # Very basic DE detection
+lang_instruction = "Analysieren Sie diese Klausel auf Verbraucherrisiko."
+messages = [{"role": "user", "content": f"{lang_instruction}\n\n{clause_text[:2000]}"}]
+return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+def _classification_prompt(self, clause_text: str) -> str:
+# Detect language
+lang_instruction = "Classify this contract clause."
+if "est" in clause_text and "le" in clause_text:
+lang_instruction = "Classifiez cette clause contractuelle."
+elif "und" in clause_text and "der" in clause_text:
+lang_instruction = "Klassifizieren Sie diese Vertragsklausel."
+messages = [{"role": "user", "content": f"{lang_instruction}\n\n{clause_text[:2000]}"}]
+return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
 def _parse_risk_response(self, response: str) -> RiskAnalysisResult:
 """Parse risk analysis response."""
 response = response.strip()
@@ -186,18 +254,11 @@ recommendations=recommendations[:3]
 def _parse_classification_response(self, response: str) -> ClassificationResult:
 """Parse classification response."""
 response = response.strip()
-# Common clause types
-clause_types = [
-"INDEMNIFICATION", "INSURANCE", "CONFIDENTIALITY", "TERMINATION",
-"LIABILITY", "GOVERNING LAW", "WARRANTY", "INTELLECTUAL PROPERTY",
-"NON-COMPETE", "PAYMENT", "FORCE MAJEURE", "ARBITRATION"
-]
-# Detect clause type
+# Detect clause type (highest-priority type mentioned anywhere in the response)
 detected_type = "unknown"
-for ct in clause_types:
-if ct in response.upper():
-detected_type = ct.lower().replace(" ", "_")
-break
+hits = _CLAUSE_TYPE_RE.findall(response.upper())
+if hits:
+detected_type = min(hits, key=_CLAUSE_TYPE_RANK.__getitem__).lower().replace(" ", "_")
 # Extract key indicators
 indicators = []
 if "Key Indicators" in response or "key phrases" in response.lower():
@@ -1,5 +1,5 @@
 import re
-from typing import List, Dict, Tuple
+from typing import BinaryIO, List, Dict, Tuple, Union
 import pdfplumber
 from dataclasses import dataclass
 from src.ontology import LegalNode, LegalSystem, AuthorityLevel, BindingStatus
@@ -8,9 +8,10 @@ logger = setup_logger("bale_ingestion")
 class PDFProcessor:
 def __init__(self):
 pass
-def extract_layout_aware_text(self, pdf_path: str) -> str:
+def extract_layout_aware_text(self, pdf_path: Union[str, BinaryIO]) -> str:
 """
 Extracts text from PDF using pdfplumber for better layout preservation.
+Accepts a file path or a seekable binary file object (e.g. an upload buffer).
 """
 text = ""
 try:
@@ -0,0 +1,51 @@
+"""
+BALE JSON I/O
+One place for the orjson-or-stdlib choice: orjson when it is installed,
+stdlib json otherwise. Both paths return UTF-8 bytes and both serialize
+dataclasses, enums, datetimes and UUIDs the way orjson does natively.
+"""
+import json
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Callable, Optional
+from uuid import UUID
+try:
+import orjson
+ORJSON_AVAILABLE = True
+except ImportError:
+ORJSON_AVAILABLE = False
+Default = Optional[Callable[[Any], Any]]
+if ORJSON_AVAILABLE:
+def dumps(obj: Any, default: Default = None, indent: bool = False) -> bytes:
+"""Serialize obj to JSON bytes; default handles otherwise unsupported types."""
+option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+return orjson.dumps(obj, default=default, option=option)
+loads = orjson.loads
+else:
+def dumps(obj: Any, default: Default = None, indent: bool = False) -> bytes:
+"""Serialize obj to JSON bytes; default handles otherwise unsupported types."""
+def fallback(o: Any) -> Any:
+if is_dataclass(o) and not isinstance(o, type):
+return asdict(o)
+if isinstance(o, Enum):
+return o.value
+if isinstance(o, (datetime, date, time)):
+return o.isoformat()
+if isinstance(o, UUID):
+return str(o)
+if default is not None:
+return default(o)
+raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+if indent:
+return json.dumps(obj, default=fallback, indent=2, ensure_ascii=False).encode("utf-8")
+return json.dumps(obj, default=fallback, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+loads = json.loads
+def read_json(path) -> Any:
+"""Load a JSON file."""
+with open(path, "rb") as f:
+return loads(f.read())
+def write_json(path, data: Any, default: Default = None, indent: bool = True) -> None:
+"""Write data to a JSON file (indented by default)."""
+with open(path, "wb") as f:
+f.write(dumps(data, default=default, indent=indent))
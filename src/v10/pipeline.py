@@ -12,9 +12,10 @@ V11 Innovations:
 import re
 import json
 import time
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from dataclasses import dataclass, asdict, field
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from src.v10.classifier_v10 import EmbeddingClassifier, get_classifier, ClassificationResult
 from src.v10.contract_graph import ContractGraph, ClauseNode, build_contract_graph, GraphAnalysis
@@ -115,6 +116,7 @@ class V10Pipeline:
         simulate_risk: bool = True,
         corpus_compare: bool = True,
         use_semantic_chunking: bool = True,
+        on_stage: Optional[Callable[[str, Any], None]] = None,
     ) -> V10Report:
         """
         Run full V11 analysis on a contract.
@@ -126,6 +128,9 @@ class V10Pipeline:
             simulate_risk: Run Monte Carlo risk simulation
             corpus_compare: Compare against learned corpus patterns
             use_semantic_chunking: Use semantic chunking instead of regex
+            on_stage: Optional callback invoked as each core stage finishes,
+                with the stage name ("classify", "graph", "power", "disputes")
+                and that stage's result, so callers can stream progress
 
         Returns:
             V10Report with all analysis results
@@ -142,6 +147,8 @@ class V10Pipeline:
         # Step 2: CLASSIFY (V11: includes calibration automatically)
         classified = self._classify_clauses(clauses)
         logger.info(f"Classified {len(classified)} clauses")
+        if on_stage:
+            on_stage("classify", classified)
 
         # Step 3: GRAPH
         graph, graph_analysis = build_contract_graph(classified, contract_type)
@@ -149,16 +156,22 @@ class V10Pipeline:
             f"Built graph: {graph_analysis.conflict_count} conflicts, "
             f"{graph_analysis.dependency_gap_count} gaps"
         )
+        if on_stage:
+            on_stage("graph", graph_analysis)
 
         # Step 4: POWER
         power_analysis = self.power_analyzer.analyze(classified, contract_text)
         logger.info(f"Power score: {power_analysis.power_score:.1f}")
+        if on_stage:
+            on_stage("power", power_analysis)
 
         # Step 5: DISPUTE
         dispute_prediction = self.dispute_predictor.predict(
             graph_analysis, power_analysis, classified
         )
         logger.info(f"Predicted {len(dispute_prediction.hotspots)} dispute hotspots")
+        if on_stage:
+            on_stage("disputes", dispute_prediction)
 
         # Step 6: Overall risk
         overall_risk = (
@@ -175,14 +188,23 @@ class V10Pipeline:
         else:
             risk_level = "LOW"
 
-        # Step 7: V11 — Clause Rewrite Suggestions
+        # Steps 7 & 8: V11 — Clause Rewrite Suggestions and Monte Carlo Risk
+        # Simulation. Both only read the results above, so when both are enabled
+        # the simulation runs on a worker thread while rewrites are encoded
+        # (the encoder and numpy release the GIL for most of their work).
         rewrite_data = None
-        if suggest_rewrites:
-            rewrite_data = self._suggest_rewrites(classified, dispute_prediction)
-
-        # Step 8: V11 — Monte Carlo Risk Simulation
         simulation_data = None
-        if simulate_risk:
+        if suggest_rewrites and simulate_risk:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                simulation_future = pool.submit(
+                    self._simulate_risk,
+                    classified, graph_analysis, power_analysis, dispute_prediction, overall_risk,
+                )
+                rewrite_data = self._suggest_rewrites(classified, dispute_prediction)
+                simulation_data = simulation_future.result()
+        elif suggest_rewrites:
+            rewrite_data = self._suggest_rewrites(classified, dispute_prediction)
+        elif simulate_risk:
             simulation_data = self._simulate_risk(
                 classified, graph_analysis, power_analysis, dispute_prediction, overall_risk
             )
@@ -2,6 +2,7 @@
 BALE V8 Unified Analyzer
 Integrates all V8 components for comprehensive contract analysis.
 """
+import re
 import time
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
@@ -21,6 +22,20 @@ get_clause_calculator
 )
 from src.types import BaleState
 logger = setup_logger("bale_v8_analyzer")
+# ==================== CLASSIFICATION TABLES ====================
+def _build_phrase_index() -> Dict[str, List[tuple]]:
+"""Map each lowercased key phrase to the (rank, clause_id) pairs it scores."""
+index: Dict[str, List[tuple]] = {}
+for rank, (clause_id, clause_type) in enumerate(CLAUSE_TYPES.items()):
+for phrase in (clause_type.key_phrases_en or []) + (clause_type.key_phrases_fr or []):
+index.setdefault(phrase.lower(), []).append((rank, clause_id))
+return index
+# Built once at import: the per-request path no longer re-lowers every phrase
+_PHRASE_INDEX = _build_phrase_index()
+# Union of all phrases; a miss means no clause type can score
+_ANY_PHRASE_RE = re.compile(
+"|".join(re.escape(p) for p in sorted(_PHRASE_INDEX, key=len, reverse=True))
+)
 @dataclass
 class V8AnalysisResult:
 """Complete V8 analysis result."""
@@ -75,24 +90,20 @@ logger.info("BALE V8 Analyzer initialized")
 def classify_clause(self, clause_text: str) -> tuple:
 """Classify a clause into one of 75 types."""
 clause_lower = clause_text.lower()
+# Fast path: a single regex scan rules out clauses with no known phrase
+if not _ANY_PHRASE_RE.search(clause_lower):
+return "unknown", "GENERAL", 0
 # Score each clause type based on keyword matching
-scores = {}
-for clause_id, clause_type in CLAUSE_TYPES.items():
-score = 0
-# Check key phrases
-if clause_type.key_phrases_en:
-for phrase in clause_type.key_phrases_en:
-if phrase.lower() in clause_lower:
-score += 10
-if clause_type.key_phrases_fr:
-for phrase in clause_type.key_phrases_fr:
-if phrase.lower() in clause_lower:
-score += 10
-if score > 0:
-scores[clause_id] = score
-# Get best match
+scores: Dict[str, int] = {}
+ranks: Dict[str, int] = {}
+for phrase, owners in _PHRASE_INDEX.items():
+if phrase in clause_lower:
+for rank, clause_id in owners:
+scores[clause_id] = scores.get(clause_id, 0) + 10
+ranks[clause_id] = rank
+# Get best match (ties go to the earliest clause type, as before)
 if scores:
-best_match = max(scores, key=scores.get)
+best_match = max(scores, key=lambda cid: (scores[cid], -ranks[cid]))
 clause_type = CLAUSE_TYPES[best_match]
 return best_match, clause_type.category.value, scores[best_match]
 return "unknown", "GENERAL", 0
@@ -0,0 +1,179 @@
+"""
+BALE Benchmark Metrics Tests
+Checks that the columnar benchmark metrics match the original per-result
+computation, and that runs are timed per sample and reproducible.
+"""
+import pytest
+import gc
+import itertools
+import random
+import statistics
+from collections import defaultdict
+import sys
+import os
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+TYPES = ["Indemnification", "termination_cause", "liability_cap", "governing_law", "confidentiality"]
+RISKS = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+def make_rows(n=400, seed=7):
+"""Result rows with mixed-case labels and roughly 30% misclassifications."""
+rng = random.Random(seed)
+rows = []
+for i in range(n):
+gt_type = rng.choice(TYPES)
+pred_type = gt_type if rng.random() < 0.7 else rng.choice(TYPES + ["unknown"])
+if rng.random() < 0.2:
+pred_type = pred_type.upper()
+gt_risk = rng.choice(RISKS)
+pred_risk = gt_risk if rng.random() < 0.8 else rng.choice(RISKS)
+rows.append((f"s{i}", gt_type, pred_type, gt_risk.lower(), pred_risk, rng.random(), rng.randint(50, 50000)))
+return rows
+def reference_metrics(rows):
+"""The per-result metric computation the columnar table replaced."""
+results = [
+(gt.lower(), pr.lower(), gt.lower() == pr.lower(), gr.upper() == prr.upper(), conf, lat)
+for _, gt, pr, gr, prr, conf, lat in rows
+]
+n = len(results)
+tp, fp, fn = defaultdict(int), defaultdict(int), defaultdict(int)
+for gt, pr, type_ok, _, _, _ in results:
+if type_ok:
+tp[gt] += 1
+else:
+fp[pr] += 1
+fn[gt] += 1
+precision, recall, f1 = {}, {}, {}
+for t in {r[0] for r in results}:
+p = tp[t] / (tp[t] + fp[t]) if (tp[t] + fp[t]) > 0 else 0
+r = tp[t] / (tp[t] + fn[t]) if (tp[t] + fn[t]) > 0 else 0
+precision[t], recall[t] = p, r
+f1[t] = 2 * p * r / (p + r) if (p + r) > 0 else 0
+latencies = sorted(r[5] for r in results)
+return {
+"type_accuracy": sum(r[2] for r in results) / n,
+"risk_accuracy": sum(r[3] for r in results) / n,
+"type_precision": precision,
+"type_recall": recall,
+"type_f1": f1,
+"macro_f1": statistics.mean(f1.values()),
+"avg_latency_us": statistics.mean(latencies),
+"p50_latency_us": latencies[n // 2],
+"p95_latency_us": latencies[int(n * 0.95)],
+"p99_latency_us": latencies[int(n * 0.99)],
+"avg_confidence": statistics.mean(r[4] for r in results),
+"confidence_when_correct": statistics.mean(r[4] for r in results if r[2]),
+"confidence_when_wrong": statistics.mean(r[4] for r in results if not r[2]),
+}
+@pytest.fixture
+def benchmark():
+"""A benchmark runner using the analyzer-free evaluator."""
+from benchmarks.benchmark_suite import BALEBenchmark, BenchmarkConfig
+bench = BALEBenchmark(BenchmarkConfig(num_samples=120, batch_size=16))
+bench.analyzer = None
+bench._evaluate_sample = bench._make_fallback_evaluator()
+return bench
+# ==================== METRIC EQUIVALENCE ====================
+class TestMetricEquivalence:
+"""Test the vectorized metrics against the per-result computation."""
+def test_confusion_counts_match_loop(self):
+"""The numba/bincount kernel agrees with a plain loop, unused classes included."""
+import numpy as np
+from benchmarks._metrics_kernels import confusion_counts
+rng = np.random.default_rng(3)
+k = 12
+gt = rng.integers(0, k - 2, size=5000).astype(np.int32)
+pr = np.where(rng.random(5000) < 0.6, gt, rng.integers(0, k, size=5000)).astype(np.int32)
+tp, fp, fn = confusion_counts(gt, pr, k)
+expected = np.zeros((3, k), dtype=np.int64)
+for g, p in zip(gt, pr):
+if g == p:
+expected[0, g] += 1
+else:
+expected[1, p] += 1
+expected[2, g] += 1
+assert len(tp) == len(fp) == len(fn) == k
+np.testing.assert_array_equal(np.stack([tp, fp, fn]), expected)
+def test_compute_metrics_matches_reference(self, benchmark):
+"""Every aggregate equals the original per-result computation."""
+from benchmarks.benchmark_suite import BenchmarkResultTable
+rows = make_rows()
+benchmark.results = BenchmarkResultTable(len(rows))
+for i, row in enumerate(rows):
+benchmark.results.set(i, row)
+metrics = benchmark._compute_metrics()
+expected = reference_metrics(rows)
+assert metrics.total_samples == len(rows)
+for name in ("p50_latency_us", "p95_latency_us", "p99_latency_us"):
+assert getattr(metrics, name) == expected[name], name
+for name in ("type_accuracy", "risk_accuracy", "macro_f1", "avg_latency_us"):
+assert getattr(metrics, name) == pytest.approx(expected[name]), name
+# Confidences are stored as float32
+for name in ("avg_confidence", "confidence_when_correct", "confidence_when_wrong"):
+assert getattr(metrics, name) == pytest.approx(expected[name], rel=1e-6), name
+for name in ("type_precision", "type_recall", "type_f1"):
+assert getattr(metrics, name) == pytest.approx(expected[name]), name
+def test_empty_results(self, benchmark):
+"""No results gives zeroed metrics."""
+from benchmarks.benchmark_suite import BenchmarkResultTable
+benchmark.results = BenchmarkResultTable(0)
+metrics = benchmark._compute_metrics()
+assert metrics.total_samples == 0
+assert metrics.macro_f1 == 0.0
+def test_results_round_trip(self):
+"""Iterating the table rebuilds the original rows with normalized labels."""
+from benchmarks.benchmark_suite import BenchmarkResultTable
+rows = make_rows(n=50)
+table = BenchmarkResultTable(len(rows))
+for i, row in enumerate(rows):
+table.set(i, row)
+for row, result in zip(rows, table):
+sample_id, gt_type, pred_type, gt_risk, pred_risk, _, latency_us = row
+assert result.sample_id == sample_id
+assert result.ground_truth_type == gt_type.lower()
+assert result.predicted_type == pred_type.lower()
+assert result.ground_truth_risk == gt_risk.upper()
+assert result.is_type_correct == (gt_type.lower() == pred_type.lower())
+assert result.is_risk_correct == (gt_risk.upper() == pred_risk.upper())
+assert result.latency_us == latency_us
+# ==================== RUNS ====================
+class TestBenchmarkRun:
+"""Test timing, reproducibility and GC handling of full runs."""
+def test_latency_per_sample(self, benchmark, monkeypatch):
+"""Each sample is timed on its own rather than as a batch average."""
+from benchmarks import benchmark_suite
+ticks = itertools.count()
+# Clock reads alternate start/end; sample i starts at 0 and ends at i microseconds
+def fake_clock():
+tick = next(ticks)
+return 0 if tick % 2 == 0 else (tick // 2) * 1000
+monkeypatch.setattr(benchmark_suite.time, "perf_counter_ns", fake_clock)
+benchmark._evaluate_sample = benchmark._make_fallback_evaluator()
+benchmark.run()
+latencies = [r.latency_us for r in benchmark.results]
+assert latencies == list(range(len(latencies)))
+def test_seeded_confidences_reproduce(self, benchmark):
+"""Serial and threaded runs with the same seed give identical results."""
+from benchmarks.benchmark_suite import BALEBenchmark, BenchmarkConfig
+benchmark.run()
+serial = [(r.sample_id, r.confidence) for r in benchmark.results]
+parallel = BALEBenchmark(BenchmarkConfig(num_samples=120, batch_size=16, parallel=True, num_workers=4))
+parallel.analyzer = None
+parallel._evaluate_sample = parallel._make_fallback_evaluator()
+parallel.run()
+assert [(r.sample_id, r.confidence) for r in parallel.results] == serial
+assert len(set(c for _, c in serial)) > 1
+def test_gc_state_restored(self, benchmark):
+"""run() leaves the collector enabled or disabled as it found it."""
+was_enabled = gc.isenabled()
+try:
+gc.disable()
+benchmark.run()
+assert not gc.isenabled()
+gc.enable()
+benchmark.run()
+assert gc.isenabled()
+finally:
+if was_enabled:
+gc.enable()
+else:
+gc.disable()
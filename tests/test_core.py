@@ -90,6 +90,51 @@ assert node.id == "test_1"
 assert node.system == LegalSystem.CIVIL_LAW
 weight = node.calculate_weight()
 assert weight > 0
+# ==================== V8 CLASSIFICATION TESTS ====================
+def _reference_classify(clause_text):
+"""Per-type phrase scan that the precompiled phrase index replaced."""
+from src.ontology.clause_ontology import CLAUSE_TYPES
+clause_lower = clause_text.lower()
+scores = {}
+for clause_id, clause_type in CLAUSE_TYPES.items():
+score = 0
+for phrase in (clause_type.key_phrases_en or []) + (clause_type.key_phrases_fr or []):
+if phrase.lower() in clause_lower:
+score += 10
+if score > 0:
+scores[clause_id] = score
+if scores:
+best_match = max(scores, key=scores.get)
+return best_match, CLAUSE_TYPES[best_match].category.value, scores[best_match]
+return "unknown", "GENERAL", 0
+class TestV8ClassifyClause:
+"""Test BALEV8Analyzer.classify_clause against the per-type scan."""
+@pytest.fixture
+def analyzer(self):
+from src.v8_analyzer import get_v8_analyzer
+return get_v8_analyzer()
+def test_no_known_phrase(self, analyzer):
+"""Clauses matching no phrase take the fast path to unknown."""
+assert analyzer.classify_clause("The weather was pleasant on Tuesday.") == ("unknown", "GENERAL", 0)
+assert analyzer.classify_clause("") == ("unknown", "GENERAL", 0)
+def test_every_phrase_matches_reference(self, analyzer):
+"""Each key phrase, in any case, classifies exactly as the per-type scan."""
+from src.ontology.clause_ontology import CLAUSE_TYPES
+for clause_type in CLAUSE_TYPES.values():
+for phrase in (clause_type.key_phrases_en or []) + (clause_type.key_phrases_fr or []):
+for text in (phrase, f"The Parties agree that {phrase.upper()} applies."):
+assert analyzer.classify_clause(text) == _reference_classify(text), text
+def test_combined_phrases_match_reference(self, analyzer):
+"""Clauses hitting several types keep the same scores and tie-breaking."""
+from src.ontology.clause_ontology import CLAUSE_TYPES
+phrases = [
+phrase
+for clause_type in CLAUSE_TYPES.values()
+for phrase in (clause_type.key_phrases_en or []) + (clause_type.key_phrases_fr or [])
+]
+for i in range(len(phrases)):
+text = f"{phrases[i]}; {phrases[(i * 7 + 3) % len(phrases)]} and {phrases[(i * 13 + 5) % len(phrases)]}"
+assert analyzer.classify_clause(text) == _reference_classify(text), text
 # ==================== EXPLAINABILITY TESTS ====================
 class TestExplainability:
 """Test the explainability module."""
@@ -100,12 +100,15 @@ class TestWebhooks:
 """Test webhook system."""
 def test_signature_generation(self):
 """Test webhook signature generation."""
-from api.webhooks import generate_signature, verify_signature
-payload = '{"event": "test"}'
-secret = "test_secret"
-signature = generate_signature(payload, secret)
+from api.webhooks import generate_signature, format_signature, verify_signature
+payload = b'{"event": "test"}'
+secret = b"test_secret"
+digest = generate_signature(payload, secret)
+assert len(digest) == 32 # raw SHA256
+signature = format_signature(digest)
 assert len(signature) == 64 # SHA256 hex
 assert verify_signature(payload, secret, signature)
+assert not verify_signature(payload, secret, "not-hex")
 def test_event_creation(self):
 """Test webhook event creation."""
 from api.webhooks import WebhookEvent, EventType
@@ -0,0 +1,114 @@
+"""
+BALE Inference Cache Tests
+Unit tests for the benchmark prediction cache and the shared JSON helpers.
+"""
+import pytest
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from uuid import UUID
+import sys
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+class FakeResult:
+def __init__(self, clause_type):
+self.clause_type = clause_type
+class FakeEngine:
+"""Stands in for BALELocalInference, recording which texts reach the model."""
+def __init__(self, adapter_path):
+self.adapter_path = str(adapter_path)
+self.calls = []
+def classify_clauses_batch(self, texts):
+self.calls.append(list(texts))
+return [FakeResult("unknown" if "???" in t else f"type-{len(t)}") for t in texts]
+@pytest.fixture
+def adapter(tmp_path):
+"""An adapter directory with a weights file."""
+path = tmp_path / "adapter"
+path.mkdir()
+(path / "adapters.safetensors").write_bytes(b"weights-v1")
+return path
+@pytest.fixture
+def cache_path(tmp_path):
+return str(tmp_path / "cache" / "infer.json")
+# ==================== CACHED PREDICTIONS ====================
+class TestCachedPredictions:
+"""Test memoization, persistence and invalidation."""
+def test_misses_deduplicated(self, adapter, cache_path):
+"""Only unseen, distinct texts are sent to the model."""
+from evaluation.inference_cache import CachedPredictions
+engine = FakeEngine(adapter)
+cache = CachedPredictions(engine, path=cache_path)
+assert cache.clause_types(["aa", "bbb", "aa"]) == ["type-2", "type-3", "type-2"]
+assert cache.clause_types(["bbb", "cccc"]) == ["type-3", "type-4"]
+assert engine.calls == [["aa", "bbb"], ["cccc"]]
+def test_fallback_values_not_cached(self, adapter, cache_path):
+"""Failed generations are returned but retried next time."""
+from evaluation.inference_cache import CachedPredictions
+engine = FakeEngine(adapter)
+cache = CachedPredictions(engine, path=cache_path)
+assert cache.clause_types(["???"]) == ["unknown"]
+assert cache.clause_types(["???"]) == ["unknown"]
+assert engine.calls == [["???"], ["???"]]
+def test_persisted_across_runs(self, adapter, cache_path):
+"""Saved predictions are reused by the next run with the same weights."""
+from evaluation.inference_cache import CachedPredictions
+first = CachedPredictions(FakeEngine(adapter), path=cache_path)
+first.clause_types(["aa"])
+first.save()
+engine = FakeEngine(adapter)
+assert CachedPredictions(engine, path=cache_path).clause_types(["aa"]) == ["type-2"]
+assert engine.calls == []
+def test_new_weights_invalidate(self, adapter, cache_path):
+"""Retraining the adapter in place starts a fresh cache."""
+from evaluation.inference_cache import CachedPredictions
+first = CachedPredictions(FakeEngine(adapter), path=cache_path)
+first.clause_types(["aa"])
+first.save()
+(adapter / "adapters.safetensors").write_bytes(b"weights-v2-retrained")
+engine = FakeEngine(adapter)
+CachedPredictions(engine, path=cache_path).clause_types(["aa"])
+assert engine.calls == [["aa"]]
+def test_disabled_neither_reads_nor_writes(self, adapter, cache_path):
+"""enabled=False (--no-cache) ignores the cache file and never writes one."""
+from evaluation.inference_cache import CachedPredictions
+first = CachedPredictions(FakeEngine(adapter), path=cache_path)
+first.clause_types(["aa"])
+first.save()
+mtime = os.stat(cache_path).st_mtime_ns
+engine = FakeEngine(adapter)
+cache = CachedPredictions(engine, path=cache_path, enabled=False)
+cache.clause_types(["aa"])
+cache.save()
+assert engine.calls == [["aa"]]
+assert os.stat(cache_path).st_mtime_ns == mtime
+# ==================== JSON HELPERS ====================
+class Color(Enum):
+RED = "red"
+@dataclass
+class Point:
+x: int
+color: Color
+class TestJsonIO:
+"""Test src.jsonio with or without orjson installed."""
+def test_native_types(self):
+"""Dataclasses, enums, datetimes and UUIDs serialize like orjson."""
+from src import jsonio
+when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+uid = UUID("12345678-1234-4678-9234-567812345678")
+data = jsonio.loads(jsonio.dumps({"p": Point(1, Color.RED), "when": when, "id": uid}))
+assert data == {"p": {"x": 1, "color": "red"}, "when": when.isoformat(), "id": str(uid)}
+def test_default_and_errors(self):
+"""Unknown types go through default, or raise TypeError without one."""
+from src import jsonio
+assert jsonio.loads(jsonio.dumps({"s": {1}}, default=sorted)) == {"s": [1]}
+with pytest.raises(TypeError):
+jsonio.dumps({"s": {1}})
+def test_file_round_trip(self, tmp_path):
+"""write_json/read_json round-trip non-ASCII text."""
+from src import jsonio
+path = tmp_path / "data.json"
+jsonio.write_json(path, {"clause": "tous dommages — indemnité"})
+assert jsonio.read_json(path) == {"clause": "tous dommages — indemnité"}
+assert isinstance(jsonio.dumps([1]), bytes)
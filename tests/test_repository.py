@@ -0,0 +1,276 @@
+"""
+BALE Repository Tests
+Unit tests for the data access layer. The PostgreSQL tests run only when
+TEST_DATABASE_URL points at a scratch database; everything they create is
+rolled back.
+"""
+import pytest
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+class FakeSession:
+"""Records the transaction calls unit_of_work makes."""
+def __init__(self):
+self.info = {}
+self.calls = []
+def commit(self):
+self.calls.append("commit")
+def rollback(self):
+self.calls.append("rollback")
+@contextmanager
+def begin_nested(self):
+self.calls.append("savepoint")
+try:
+yield
+except Exception:
+self.calls.append("rollback savepoint")
+raise
+self.calls.append("release savepoint")
+@pytest.fixture
+def pg_session():
+"""Session inside a throwaway PostgreSQL transaction (needs TEST_DATABASE_URL)."""
+url = os.getenv("TEST_DATABASE_URL")
+if not url:
+pytest.skip("TEST_DATABASE_URL not set")
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from database.models import Base, User, Contract
+engine = create_engine(url)
+connection = engine.connect()
+outer = connection.begin()
+Base.metadata.create_all(connection, tables=[User.__table__, Contract.__table__])
+# Repository commits become savepoints; the outer rollback discards everything
+session = Session(bind=connection, join_transaction_mode="create_savepoint")
+try:
+yield session
+finally:
+session.close()
+outer.rollback()
+connection.close()
+engine.dispose()
+@pytest.fixture
+def user_cache():
+"""The process-wide user cache, emptied around each test."""
+from database import repository
+repository._user_cache.clear()
+yield repository._user_cache
+repository._user_cache.clear()
+# ==================== IDS & CURSORS ====================
+class TestGenerateUuid:
+"""Test the os.urandom based UUID generator."""
+def test_canonical_v4_format(self):
+"""Ids are lowercase hyphenated version 4, RFC 4122 variant UUIDs."""
+from database.models import generate_uuid
+pattern = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$")
+for _ in range(1000):
+value = generate_uuid()
+assert pattern.match(value), value
+parsed = uuid.UUID(value)
+assert parsed.version == 4
+assert parsed.variant == uuid.RFC_4122
+assert str(parsed) == value
+def test_unique(self):
+"""Ids do not repeat."""
+from database.models import generate_uuid
+assert len({generate_uuid() for _ in range(10000)}) == 10000
+class TestKeysetCursor:
+"""Test keyset pagination cursors."""
+def test_full_page_has_cursor(self):
+"""A full page points at its last row."""
+from database.repository import _next_cursor
+from types import SimpleNamespace
+now = datetime.now(timezone.utc)
+rows = [SimpleNamespace(created_at=now, id="b"), SimpleNamespace(created_at=now, id="a")]
+assert _next_cursor(rows, 2) == (now, "a")
+def test_short_page_is_last(self):
+"""A short or empty page ends pagination."""
+from database.repository import _next_cursor
+from types import SimpleNamespace
+rows = [SimpleNamespace(created_at=datetime.now(timezone.utc), id="a")]
+assert _next_cursor(rows, 2) is None
+assert _next_cursor([], 2) is None
+def test_list_summaries_uses_row_comparison(self):
+"""Cursor pages filter on (created_at, id) and never OFFSET."""
+from sqlalchemy.dialects import postgresql
+from database.repository import ContractRepository
+statements = []
+class CapturingSession:
+def execute(self, stmt):
+statements.append(stmt)
+return self
+def all(self):
+return []
+repo = ContractRepository(CapturingSession())
+rows, cursor = repo.list_summaries("owner-1", limit=10, cursor=(datetime.now(timezone.utc), "c-1"))
+assert (rows, cursor) == ([], None)
+sql = str(statements[0].compile(dialect=postgresql.dialect()))
+assert "(contracts.created_at, contracts.id) < (" in sql
+assert "ORDER BY contracts.created_at DESC, contracts.id DESC" in sql
+assert "OFFSET" not in sql
+# ==================== UNIT OF WORK ====================
+class TestUnitOfWork:
+"""Test transaction scoping across repository calls."""
+def test_outer_scope_commits_once(self):
+"""The outermost scope commits; repository writes inside it do not."""
+from database.repository import unit_of_work, BaseRepository
+db = FakeSession()
+with unit_of_work(db):
+repo = BaseRepository(db)
+assert repo.in_unit_of_work
+repo._commit()
+repo._commit()
+assert db.calls == ["commit"]
+assert db.info == {}
+def test_outer_scope_rolls_back(self):
+"""An error in the outermost scope rolls back and propagates."""
+from database.repository import unit_of_work
+db = FakeSession()
+with pytest.raises(ValueError):
+with unit_of_work(db):
+raise ValueError("boom")
+assert db.calls == ["rollback"]
+assert db.info == {}
+def test_nested_scope_uses_savepoint(self):
+"""Inner scopes run in a savepoint and leave the commit to the outer scope."""
+from database.repository import unit_of_work, _UNIT_OF_WORK
+db = FakeSession()
+with unit_of_work(db):
+with unit_of_work(db):
+assert db.info[_UNIT_OF_WORK] == 2
+assert db.info[_UNIT_OF_WORK] == 1
+assert db.calls == ["savepoint", "release savepoint", "commit"]
+def test_caught_inner_failure_keeps_outer_work(self):
+"""A failed inner scope rolls back its savepoint only."""
+from database.repository import unit_of_work, _UNIT_OF_WORK
+db = FakeSession()
+with unit_of_work(db):
+try:
+with unit_of_work(db):
+raise ValueError("boom")
+except ValueError:
+pass
+assert db.info[_UNIT_OF_WORK] == 1
+assert db.calls == ["savepoint", "rollback savepoint", "commit"]
+assert db.info == {}
+def test_nested_scopes_in_postgres(self, pg_session):
+"""Only the failed inner scope's rows are discarded."""
+from database.models import User
+from database.repository import unit_of_work, UserRepository
+repo = UserRepository(pg_session)
+with unit_of_work(pg_session):
+kept = repo.create("kept@example.com")
+try:
+with unit_of_work(pg_session):
+repo.create("dropped@example.com")
+raise ValueError("boom")
+except ValueError:
+pass
+emails = {u.email for u in pg_session.query(User).filter(User.email.like("%@example.com"))}
+assert emails == {"kept@example.com"}
+assert kept.email == "kept@example.com"
+# ==================== USER CACHE ====================
+class TestUserCache:
+"""Test eviction of cached user rows."""
+def make_user(self, email="ada@example.com"):
+from database.models import User
+return User(id=str(uuid.uuid4()), email=email, role="analyst", is_active=True)
+def test_invalidate_drops_id_and_email(self, user_cache):
+"""invalidate() removes both lookup keys, including the cached email."""
+from database.repository import UserRepository
+user = self.make_user()
+repo = UserRepository(FakeSession())
+repo._remember(user)
+assert ("id", user.id) in user_cache and ("email", user.email) in user_cache
+repo.invalidate(user.id)
+assert ("id", user.id) not in user_cache
+assert ("email", user.email) not in user_cache
+def test_evicted_again_after_commit(self, user_cache):
+"""A row re-cached before the commit is evicted when the session commits."""
+from database.repository import UserRepository, _evict_committed_users, _EVICT_USERS
+user = self.make_user()
+db = FakeSession()
+repo = UserRepository(db)
+repo.invalidate(user.id, user.email)
+repo._remember(user) # concurrent lookup of the pre-commit row
+_evict_committed_users(db)
+assert ("id", user.id) not in user_cache
+assert ("email", user.email) not in user_cache
+assert _EVICT_USERS not in db.info
+def test_rollback_forgets_pending_evictions(self, user_cache):
+"""Pending evictions are dropped with the transaction on rollback."""
+from database.repository import UserRepository, _forget_user_evictions, _EVICT_USERS
+user = self.make_user()
+db = FakeSession()
+UserRepository(db).invalidate(user.id)
+_forget_user_evictions(db)
+assert _EVICT_USERS not in db.info
+def test_orm_edit_evicts_on_flush(self, pg_session, user_cache):
+"""Changing a user through the ORM evicts its old and new email."""
+from database.repository import UserRepository
+repo = UserRepository(pg_session)
+user = repo.create("old@example.com")
+assert repo.get_by_email("old@example.com") is not None
+user.email = "new@example.com"
+user.is_active = False
+pg_session.commit()
+assert ("email", "old@example.com") not in user_cache
+assert ("id", user.id) not in user_cache
+assert repo.get_by_email("old@example.com") is None
+assert repo.get_by_id(user.id).is_active is False
+def test_update_last_login_evicts(self, pg_session, user_cache):
+"""Bulk UPDATEs through the repository evict the cached row."""
+from database.repository import UserRepository
+repo = UserRepository(pg_session)
+user = repo.create("login@example.com")
+repo.get_by_id(user.id)
+repo.update_last_login(user.id)
+assert ("id", user.id) not in user_cache
+assert repo.get_by_id(user.id).last_login_at is not None
+# ==================== CONTRACTS (POSTGRESQL) ====================
+class TestContractRepository:
+"""Test contract queries against PostgreSQL."""
+@pytest.fixture
+def owner(self, pg_session):
+from database.repository import UserRepository
+return UserRepository(pg_session).create("owner@example.com")
+@pytest.mark.parametrize("old, new, trend", [
+(None, 50, None),
+(50, 56, "increasing"),
+(50, 44, "decreasing"),
+(50, 55, "stable"),
+(50, 45, "stable"),
+])
+def test_update_risk_trend(self, pg_session, owner, old, new, trend):
+"""The trend compares the new score with the pre-update score."""
+from database.repository import ContractRepository
+repo = ContractRepository(pg_session)
+contract = repo.create(owner.id, "MSA", latest_risk_score=old, risk_trend=None)
+repo.update_risk(contract.id, new)
+contract = repo.get_by_id(contract.id)
+assert contract.latest_risk_score == new
+assert contract.risk_trend == trend
+def test_keyset_pages_cover_all_rows(self, pg_session, owner):
+"""Paging by cursor returns every row once, newest first, ties broken by id."""
+from database.repository import ContractRepository
+repo = ContractRepository(pg_session)
+base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+# Pairs of rows share a created_at so the id tiebreak is exercised
+for i in range(7):
+repo.create(owner.id, f"contract-{i}", created_at=base + timedelta(days=i // 2))
+seen, cursor = [], None
+while True:
+rows, cursor = repo.list_summaries(owner.id, limit=3, cursor=cursor)
+seen.extend(rows)
+if cursor is None:
+break
+keys = [(row.created_at, row.id) for row in seen]
+assert len(keys) == 7
+assert keys == sorted(keys, reverse=True)
+contracts, cursor = repo.get_by_owner(owner.id, limit=3)
+assert [c.id for c in contracts] == [row.id for row in seen[:3]]
+assert cursor == keys[2]
@@ -0,0 +1,304 @@
+"""
+BALE Webhook Tests
+Unit tests for webhook retry classification, delivery dedup and the DLQ.
+"""
+import pytest
+import asyncio
+import json
+import time
+import sys
+import os
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+class FakeAsyncRedis:
+"""In-memory stand-in for the redis.asyncio calls the DLQ makes."""
+def __init__(self):
+self.lists = {}
+self.sets = {}
+self.keys = {}
+async def lpush(self, key, value):
+self.lists.setdefault(key, []).insert(0, value)
+async def rpoplpush(self, src, dst):
+items = self.lists.get(src)
+if not items:
+return None
+value = items.pop()
+self.lists.setdefault(dst, []).insert(0, value)
+return value
+async def lrem(self, key, count, value):
+items = self.lists.get(key, [])
+if value in items:
+items.remove(value)
+async def ltrim(self, key, start, end):
+self.lists[key] = self.lists.get(key, [])[start:end + 1]
+async def llen(self, key):
+return len(self.lists.get(key, []))
+async def set(self, key, value, ex=None):
+self.keys[key] = value
+async def exists(self, key):
+return int(key in self.keys)
+async def sadd(self, key, member):
+self.sets.setdefault(key, set()).add(member)
+async def srem(self, key, member):
+self.sets.get(key, set()).discard(member)
+async def smembers(self, key):
+return set(self.sets.get(key, set()))
+async def aclose(self):
+pass
+@pytest.fixture
+def webhooks():
+"""The webhooks module under test."""
+import api.webhooks as webhooks
+return webhooks
+@pytest.fixture
+def sleeps(webhooks, monkeypatch):
+"""Backoff delays, recorded instead of awaited."""
+delays = []
+async def fake_sleep(delay):
+delays.append(delay)
+monkeypatch.setattr(webhooks.asyncio, "sleep", fake_sleep)
+return delays
+@pytest.fixture
+def endpoint(webhooks, sleeps):
+"""An active endpoint subscribed to analysis.completed."""
+return webhooks.WebhookEndpoint(
+id="ep-1",
+url="https://example.com/hook",
+secret="s3cret",
+events=[webhooks.EventType.ANALYSIS_COMPLETED]
+)
+def make_dispatcher(webhooks, endpoint, responses):
+"""Dispatcher whose POSTs answer from responses and whose DLQ pushes are recorded."""
+dispatcher = webhooks.WebhookDispatcher()
+dispatcher.register_endpoint(endpoint)
+dispatcher.posts = []
+dispatcher.dlq = []
+async def fake_post(url, payload, headers):
+dispatcher.posts.append(headers)
+response = responses.pop(0)
+if isinstance(response, Exception):
+raise response
+return response
+async def fake_dlq_push(payload, event_headers, endpoint, error):
+dispatcher.dlq.append((event_headers["X-BALE-Delivery"], error))
+dispatcher._post = fake_post
+dispatcher._dlq_push = fake_dlq_push
+return dispatcher
+def deliver(webhooks, dispatcher, endpoint, event_id="evt-1"):
+headers = webhooks._event_headers(webhooks.EventType.ANALYSIS_COMPLETED.value, event_id)
+asyncio.run(dispatcher._deliver_to_endpoint(b'{"id": "evt-1"}', headers, endpoint))
+# ==================== RETRY CLASSIFICATION ====================
+class TestRetryClassification:
+"""Test which delivery failures are retried."""
+def test_server_error_then_success(self, webhooks, endpoint):
+"""5xx responses are retried until the endpoint accepts."""
+dispatcher = make_dispatcher(webhooks, endpoint, [(503, None), (502, None), (200, None)])
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 3
+assert dispatcher.dlq == []
+assert endpoint.failure_count == 0
+assert endpoint.last_triggered_at is not None
+def test_client_error_not_retried(self, webhooks, endpoint):
+"""Other 4xx responses fail once, without retries or a DLQ entry."""
+dispatcher = make_dispatcher(webhooks, endpoint, [(404, None)])
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 1
+assert dispatcher.dlq == []
+assert endpoint.failure_count == 1
+def test_rate_limit_honors_retry_after(self, webhooks, endpoint, sleeps):
+"""429 is retried after the server's Retry-After delay."""
+dispatcher = make_dispatcher(webhooks, endpoint, [(429, "7"), (200, None)])
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 2
+assert sleeps == [7.0]
+def test_transport_error_retried(self, webhooks, endpoint):
+"""Connection errors are retried like 5xx responses."""
+error = webhooks.aiohttp.ClientConnectionError("reset")
+dispatcher = make_dispatcher(webhooks, endpoint, [error, (200, None)])
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 2
+assert endpoint.failure_count == 0
+def test_exhausted_retries_go_to_dlq(self, webhooks, endpoint):
+"""Three retryable failures hand the delivery to the DLQ."""
+dispatcher = make_dispatcher(webhooks, endpoint, [(500, None)] * 3)
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 3
+assert dispatcher.dlq == [("evt-1", "HTTP 500")]
+assert endpoint.failure_count == 1
+def test_retry_after_parsing(self, webhooks):
+"""Retry-After accepts delta-seconds only, clamped to MAX_RETRY_DELAY."""
+assert webhooks._retry_after_seconds(None) is None
+assert webhooks._retry_after_seconds("") is None
+assert webhooks._retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") is None
+assert webhooks._retry_after_seconds("2.5") == 2.5
+assert webhooks._retry_after_seconds("-3") == 0.0
+assert webhooks._retry_after_seconds("3600") == webhooks.MAX_RETRY_DELAY
+# ==================== DEDUP ====================
+class TestDeliveryDedup:
+"""Test (endpoint, event) delivery claims."""
+def test_claim_once_per_pair(self, webhooks):
+"""A pair can be claimed once within the TTL; other pairs are independent."""
+dispatcher = webhooks.WebhookDispatcher()
+assert dispatcher._claim_delivery("ep-1", "evt-1") is True
+assert dispatcher._claim_delivery("ep-1", "evt-1") is False
+assert dispatcher._claim_delivery("ep-2", "evt-1") is True
+assert dispatcher._claim_delivery("ep-1", "evt-2") is True
+def test_claim_expires(self, webhooks):
+"""A pair can be claimed again once its deadline has passed."""
+dispatcher = webhooks.WebhookDispatcher()
+dispatcher._claim_delivery("ep-1", "evt-1")
+dispatcher._inflight[("ep-1", "evt-1")] = time.monotonic() - 1
+assert dispatcher._claim_delivery("ep-1", "evt-1") is True
+def test_duplicate_delivery_skipped(self, webhooks, endpoint):
+"""Delivering the same event twice to an endpoint POSTs once."""
+dispatcher = make_dispatcher(webhooks, endpoint, [(200, None)])
+deliver(webhooks, dispatcher, endpoint)
+deliver(webhooks, dispatcher, endpoint)
+assert len(dispatcher.posts) == 1
+# ==================== DEAD-LETTER QUEUE ====================
+class TestDeadLetterQueue:
+"""Test DLQ persistence, draining and orphan recovery."""
+@pytest.fixture
+def redis(self):
+return FakeAsyncRedis()
+def make_entry(self, webhooks, attempts=0, due=True):
+return json.dumps({
+"payload": '{"id": "evt-1"}',
+"event_type": webhooks.EventType.ANALYSIS_COMPLETED.value,
+"event_id": "evt-1",
+"endpoint_id": "ep-1",
+"last_error": "HTTP 500",
+"attempts": attempts,
+"next_attempt_at": time.time() + (-1 if due else 3600)
+})
+def make_dispatcher(self, webhooks, endpoint, redis, responses):
+dispatcher = make_dispatcher(webhooks, endpoint, responses)
+del dispatcher._dlq_push # use the real one
+dispatcher._redis = redis
+return dispatcher
+def test_push(self, webhooks, endpoint, redis):
+"""A failed delivery is stored with its payload and first retry time."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+headers = webhooks._event_headers(webhooks.EventType.ANALYSIS_COMPLETED.value, "evt-1")
+asyncio.run(dispatcher._dlq_push(b'{"id": "evt-1"}', headers, endpoint, "HTTP 500"))
+(raw,) = redis.lists[webhooks.WEBHOOK_DLQ_KEY]
+entry = json.loads(raw)
+assert entry["event_id"] == "evt-1"
+assert entry["endpoint_id"] == "ep-1"
+assert entry["attempts"] == 0
+assert entry["next_attempt_at"] > time.time()
+def test_entry_not_due_is_kept(self, webhooks, endpoint, redis):
+"""Entries whose retry time has not come stay queued untouched."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+raw = self.make_entry(webhooks, due=False)
+redis.lists[webhooks.WEBHOOK_DLQ_KEY] = [raw]
+asyncio.run(dispatcher._drain_dlq())
+assert redis.lists[webhooks.WEBHOOK_DLQ_KEY] == [raw]
+assert redis.lists[dispatcher._dlq_inflight_key] == []
+assert dispatcher.posts == []
+def test_redelivered_entry_is_removed(self, webhooks, endpoint, redis):
+"""A successful redelivery clears the entry from the queue and in-flight list."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [(200, None)])
+redis.lists[webhooks.WEBHOOK_DLQ_KEY] = [self.make_entry(webhooks)]
+asyncio.run(dispatcher._drain_dlq())
+assert len(dispatcher.posts) == 1
+assert redis.lists[webhooks.WEBHOOK_DLQ_KEY] == []
+assert redis.lists[dispatcher._dlq_inflight_key] == []
+assert redis.keys[dispatcher._dlq_lease_key] == "1"
+def test_failed_redelivery_is_rescheduled(self, webhooks, endpoint, redis):
+"""A failed redelivery counts the attempt and backs off to the next delay."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [(503, None)])
+redis.lists[webhooks.WEBHOOK_DLQ_KEY] = [self.make_entry(webhooks)]
+asyncio.run(dispatcher._drain_dlq())
+(raw,) = redis.lists[webhooks.WEBHOOK_DLQ_KEY]
+entry = json.loads(raw)
+assert entry["attempts"] == 1
+assert entry["last_error"] == "HTTP 503"
+assert entry["next_attempt_at"] > time.time() + webhooks.DLQ_RETRY_DELAYS[1] - 60
+assert redis.lists[dispatcher._dlq_inflight_key] == []
+def test_last_attempt_is_abandoned(self, webhooks, endpoint, redis):
+"""After the final retry the entry moves to the failed list."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [(503, None)])
+attempts = len(webhooks.DLQ_RETRY_DELAYS) - 1
+redis.lists[webhooks.WEBHOOK_DLQ_KEY] = [self.make_entry(webhooks, attempts=attempts)]
+asyncio.run(dispatcher._drain_dlq())
+assert redis.lists[webhooks.WEBHOOK_DLQ_KEY] == []
+(raw,) = redis.lists[webhooks.WEBHOOK_FAILED_KEY]
+assert json.loads(raw)["attempts"] == len(webhooks.DLQ_RETRY_DELAYS)
+def test_unsubscribed_endpoint_not_posted(self, webhooks, endpoint, redis):
+"""Entries for endpoints no longer subscribed fail without a POST."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+endpoint.events = [webhooks.EventType.CONTRACT_CREATED]
+dispatcher.register_endpoint(endpoint)
+redis.lists[webhooks.WEBHOOK_DLQ_KEY] = [self.make_entry(webhooks)]
+asyncio.run(dispatcher._drain_dlq())
+assert dispatcher.posts == []
+(raw,) = redis.lists[webhooks.WEBHOOK_DLQ_KEY]
+assert json.loads(raw)["last_error"] == "endpoint unsubscribed"
+def test_orphans_of_expired_worker_are_requeued(self, webhooks, endpoint, redis):
+"""In-flight entries of a worker whose lease expired go back on the DLQ."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+raw = self.make_entry(webhooks)
+redis.sets[webhooks.WEBHOOK_DLQ_OWNERS_KEY] = {"dead-worker"}
+redis.lists[f"{webhooks.WEBHOOK_DLQ_INFLIGHT_KEY}:dead-worker"] = [raw]
+asyncio.run(dispatcher._renew_lease(redis))
+asyncio.run(dispatcher._recover_orphans(redis))
+assert redis.lists[webhooks.WEBHOOK_DLQ_KEY] == [raw]
+assert redis.lists[f"{webhooks.WEBHOOK_DLQ_INFLIGHT_KEY}:dead-worker"] == []
+assert redis.sets[webhooks.WEBHOOK_DLQ_OWNERS_KEY] == {dispatcher._instance_id}
+def test_live_worker_entries_left_alone(self, webhooks, endpoint, redis):
+"""In-flight entries of a worker holding a lease are not touched."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+raw = self.make_entry(webhooks)
+redis.sets[webhooks.WEBHOOK_DLQ_OWNERS_KEY] = {"live-worker"}
+redis.keys[f"{webhooks.WEBHOOK_DLQ_LEASE_KEY}:live-worker"] = "1"
+redis.lists[f"{webhooks.WEBHOOK_DLQ_INFLIGHT_KEY}:live-worker"] = [raw]
+asyncio.run(dispatcher._recover_orphans(redis))
+assert redis.lists[f"{webhooks.WEBHOOK_DLQ_INFLIGHT_KEY}:live-worker"] == [raw]
+assert "live-worker" in redis.sets[webhooks.WEBHOOK_DLQ_OWNERS_KEY]
+def test_close_parks_queued_events(self, webhooks, endpoint, redis):
+"""close() awaits the cancelled workers and moves still-queued events to the DLQ."""
+dispatcher = self.make_dispatcher(webhooks, endpoint, redis, [])
+event = webhooks.WebhookEvent(
+id="evt-9",
+type=webhooks.EventType.ANALYSIS_COMPLETED,
+timestamp="2026-01-01T00:00:00+00:00",
+data={}
+)
+async def scenario():
+dispatcher._loop = asyncio.get_running_loop()
+dispatcher._queue = asyncio.Queue()
+worker = asyncio.create_task(asyncio.Event().wait())
+dispatcher._workers = [worker]
+dispatcher._queue.put_nowait(event)
+await dispatcher.close()
+return worker
+worker = asyncio.run(scenario())
+assert worker.done() and worker.cancelled()
+(raw,) = redis.lists[webhooks.WEBHOOK_DLQ_KEY]
+entry = json.loads(raw)
+assert entry["event_id"] == "evt-9"
+assert entry["last_error"] == "dispatcher closed before delivery"
+assert dispatcher.enqueue(event) is False
+# ==================== ENDPOINTS & HANDLERS ====================
+class TestEndpointsAndHandlers:
+"""Test endpoint serialization and handler registration."""
+def test_event_mask_is_internal(self, webhooks, endpoint):
+"""The subscription mask is derived from events and kept out of to_dict()."""
+assert endpoint.event_mask == webhooks.event_mask([webhooks.EventType.ANALYSIS_COMPLETED])
+assert "event_mask" not in endpoint.to_dict()
+assert "event_mask" not in repr(endpoint)
+assert endpoint.to_dict()["events"] == [webhooks.EventType.ANALYSIS_COMPLETED]
+def test_event_handlers_view(self, webhooks):
+"""event_handlers lists sync then async handlers per event type."""
+dispatcher = webhooks.WebhookDispatcher()
+def on_sync(event):
+pass
+async def on_async(event):
+pass
+dispatcher.register_handler(webhooks.EventType.ANALYSIS_COMPLETED, on_async)
+dispatcher.register_handler(webhooks.EventType.ANALYSIS_COMPLETED, on_sync)
+dispatcher.register_handler(webhooks.EventType.QUOTA_WARNING, on_sync)
+handlers = dispatcher.event_handlers
+assert handlers[webhooks.EventType.ANALYSIS_COMPLETED] == [on_sync, on_async]
+assert handlers[webhooks.EventType.QUOTA_WARNING] == [on_sync]